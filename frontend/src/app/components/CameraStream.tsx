@@ -1,14 +1,70 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import io from 'socket.io-client'
 
+// [track_id, class_id, x1, y1, x2, y2], box in units of `q` pixels
+type TrackRow = [number, number, number, number, number, number]
+
+type DetectionRecord = {
+  f: number
+  k?: 1
+  w?: number
+  h?: number
+  q?: number
+  u?: TrackRow[]
+  d?: number[]
+}
+
+const COLORS = ['#FF3838', '#FF9D97', '#FF701F', '#FFB21D', '#CFD231', '#48F90A', '#92CC17', '#3DDB86', '#1A9334', '#00D4BB']
+
 export function CameraStream() {
   const [status, setStatus] = useState<string>('Connecting...')
   const [error, setError] = useState<string | null>(null)
+  const canvasRef = useRef<HTMLCanvasElement>(null)
+  const tracks = useRef<Map<number, TrackRow>>(new Map())
+  const frame = useRef({ width: 640, height: 480, quantum: 4 })
+  const names = useRef<string[]>([])
+
+  const drawOverlay = () => {
+    const canvas = canvasRef.current
+    if (!canvas) return
+    const ctx = canvas.getContext('2d')
+    if (!ctx) return
+
+    const { clientWidth, clientHeight } = canvas
+    if (canvas.width !== clientWidth || canvas.height !== clientHeight) {
+      canvas.width = clientWidth
+      canvas.height = clientHeight
+    }
+    ctx.clearRect(0, 0, canvas.width, canvas.height)
+
+    // Match the video's object-contain letterboxing
+    const { width, height, quantum } = frame.current
+    const scale = Math.min(canvas.width / width, canvas.height / height)
+    const offsetX = (canvas.width - width * scale) / 2
+    const offsetY = (canvas.height - height * scale) / 2
+    const unit = quantum * scale
+
+    ctx.lineWidth = 2
+    ctx.font = '12px sans-serif'
+    tracks.current.forEach(([id, cls, x1, y1, x2, y2]) => {
+      const color = COLORS[id % COLORS.length]
+      const x = offsetX + x1 * unit
+      const y = offsetY + y1 * unit
+      ctx.strokeStyle = color
+      ctx.strokeRect(x, y, (x2 - x1) * unit, (y2 - y1) * unit)
+      const label = `${names.current[cls] ?? cls} ${id}`
+      ctx.fillStyle = color
+      ctx.fillRect(x, y - 16, ctx.measureText(label).width + 6, 16)
+      ctx.fillStyle = '#FFFFFF'
+      ctx.fillText(label, x + 3, y - 4)
+    })
+  }
 
   useEffect(() => {
     const socket = io('http://localhost:5003')
+    let pending = false
 
     socket.on('connect', () => {
       setStatus('Connected')
@@ -23,6 +79,28 @@ export function CameraStream() {
       setStatus(data.message)
     })
 
+    socket.on('classes', (data: { names: string[] }) => {
+      names.current = data.names
+    })
+
+    socket.on('detections', (record: DetectionRecord) => {
+      if (record.k) {
+        tracks.current.clear()
+        frame.current = { width: record.w!, height: record.h!, quantum: record.q! }
+      }
+      record.d?.forEach((id) => tracks.current.delete(id))
+      record.u?.forEach((row) => tracks.current.set(row[0], row))
+
+      // Redraw at most once per animation frame however fast events arrive
+      if (!pending) {
+        pending = true
+        requestAnimationFrame(() => {
+          pending = false
+          drawOverlay()
+        })
+      }
+    })
+
     return () => {
       socket.disconnect()
     }
@@ -36,10 +114,14 @@ export function CameraStream() {
       ) : (
         <>
           <img
-            src="http://localhost:5003/video_feed"
+            src="http://localhost:5003/video_feed?overlay=client"
             alt="Camera feed"
             className="w-full h-full object-contain"
           />
+          <canvas
+            ref={canvasRef}
+            className="absolute inset-0 w-full h-full pointer-events-none"
+          />
           <p className="absolute top-2 right-2 bg-black/50 text-white px-2 py-1 rounded">
             {status}
           </p>
@@ -47,4 +129,4 @@ export function CameraStream() {
       )}
     </div>
   )
-}
\ No newline at end of file
+}
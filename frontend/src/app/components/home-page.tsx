@@ -18,72 +18,39 @@ interface Message {
 export function HomePage() {
   const [isRecording, setIsRecording] = useState(false)  
   const [messages, setMessages] = useState<Message[]>([]);
-  const [environmentMessages, setEnvironmentMessages] = useState<string[]>([]);
-  const [currentMessageIndex, setCurrentMessageIndex] = useState(0);
   const [isCameraStarted, setIsCameraStarted] = useState(false);
 
-  useEffect(() => {
-    fetch('http://localhost:5003/api/environment-messages')
-      .then(response => {
-        if (!response.ok) {
-          throw new Error('Network response was not ok');
-        }
-        return response.json();
-      })
-      .then(data => {
-        setEnvironmentMessages(data.messages);
-      })
-      .catch(error => {
-        console.error('Error fetching environment messages:', error);
-        setEnvironmentMessages([]);
-      });
-  }, []);
-
   const addMessage = (newMessage: Message) => {
-    if (isRecording) {
-      setMessages(prevMessages => [newMessage, ...prevMessages]);
-    }
-  };
-
-  const handleNewData = (jsonData: string) => {
-    try {
-      const data = JSON.parse(jsonData);
-      if (data.time && data.message) {
-        addMessage({
-          time: data.time,
-          message: data.message
-        });
-      }
-    } catch (error) {
-      console.error('Error parsing JSON:', error);
-    }
+    setMessages(prevMessages => [newMessage, ...prevMessages]);
   };
 
+  // The server pushes each navigation message as soon as the pipeline produces it;
+  // EventSource reconnects on its own and resumes after the last event id
   useEffect(() => {
-    let interval: NodeJS.Timeout;
-    
-    if (isRecording && environmentMessages.length > 0) {
-      interval = setInterval(() => {
-        const message = environmentMessages[currentMessageIndex];
-        
-        const testJson = JSON.stringify({
-          time: new Date().toLocaleTimeString(),
-          message: message
-        });
-        handleNewData(testJson);
-        
-        setCurrentMessageIndex(prevIndex => 
-          prevIndex + 1 >= environmentMessages.length ? 0 : prevIndex + 1
-        );
-      }, 3000); 
-    }
+    if (!isRecording) return;
 
-    return () => {
-      if (interval) {
-        clearInterval(interval);
+    const source = new EventSource('http://localhost:5003/api/environment-messages/stream');
+    source.onmessage = (event) => {
+      try {
+        const data = JSON.parse(event.data);
+        if (data.time && data.message) {
+          addMessage({
+            time: new Date(data.time * 1000).toLocaleTimeString(),
+            message: data.message
+          });
+        }
+      } catch (error) {
+        console.error('Error parsing JSON:', error);
       }
     };
-  }, [isRecording, environmentMessages, currentMessageIndex]);
+    source.onerror = () => {
+      console.error('Environment message stream interrupted, reconnecting');
+    };
+
+    return () => {
+      source.close();
+    };
+  }, [isRecording]);
 
   const handleStartClick = () => {
     setIsRecording(true);
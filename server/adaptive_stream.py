@@ -0,0 +1,113 @@
+import time
+
+from vision.pipeline import LatestQueue
+
+# (output scale, JPEG quality, max fps) from best to most frugal
+QUALITY_LADDER = [
+    (1.0, 85, 30),
+    (1.0, 70, 20),
+    (0.75, 60, 15),
+    (0.5, 50, 10),
+    (0.5, 35, 5),
+]
+
+class StreamClient:
+    """One /video_feed viewer: its frame queue plus encode settings picked from how fast it drains.
+
+    The generator serving the client reports how long each part took to send.
+    Once per window the client steps down the ladder if sending kept it busy
+    most of the window or frames were dropped from its queue, and steps back up
+    after a few calm windows in a row.
+    """
+
+    def __init__(self, variant: str, queue_size: int = 2, max_fps: float = None,
+                 tier: int = 1, window: float = 1.0, ladder=QUALITY_LADDER):
+        self.variant = variant
+        self.queue = LatestQueue(maxsize=queue_size)
+        self.max_fps = max_fps
+        self.ladder = ladder
+        self.tier = tier
+        self.window = window
+        self.busy_high = 0.8  # Fraction of the window spent sending that counts as congested
+        self.busy_low = 0.3
+        self.calm_needed = 3  # Calm windows before stepping back up
+        self.last_put = 0.0
+        self.throughput = 0.0  # Smoothed send rate in bytes/s
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self._reset_window(time.monotonic())
+        self._calm = 0
+
+    @property
+    def scale(self) -> float:
+        return self.ladder[self.tier][0]
+
+    @property
+    def quality(self) -> int:
+        return self.ladder[self.tier][1]
+
+    @property
+    def interval(self) -> float:
+        fps = self.ladder[self.tier][2]
+        if self.max_fps is not None:
+            fps = min(fps, self.max_fps)
+        return 1.0 / fps
+
+    def due(self, now: float) -> bool:
+        return now - self.last_put >= self.interval
+
+    def deliver(self, part: bytes, now: float):
+        self.queue.put(part)
+        self.last_put = now
+
+    def get(self, timeout: float = None):
+        return self.queue.get(timeout)
+
+    def _reset_window(self, now: float):
+        self.window_start = now
+        self.window_bytes = 0
+        self.window_send_time = 0.0
+        self.window_dropped = self.queue.dropped
+
+    def record_send(self, nbytes: int, seconds: float):
+        self.sent_frames += 1
+        self.sent_bytes += nbytes
+        self.window_bytes += nbytes
+        self.window_send_time += seconds
+
+        now = time.monotonic()
+        elapsed = now - self.window_start
+        if elapsed < self.window:
+            return
+
+        if self.window_send_time > 0:
+            rate = self.window_bytes / self.window_send_time
+            self.throughput = rate if not self.throughput else 0.7 * self.throughput + 0.3 * rate
+        busy = self.window_send_time / elapsed
+        dropped = self.queue.dropped - self.window_dropped
+
+        if busy > self.busy_high or dropped > 0:
+            self.tier = min(self.tier + 1, len(self.ladder) - 1)
+            self._calm = 0
+        elif busy < self.busy_low:
+            self._calm += 1
+            if self._calm >= self.calm_needed:
+                self.tier = max(self.tier - 1, 0)
+                self._calm = 0
+        else:
+            self._calm = 0
+        self._reset_window(now)
+
+    def stats(self) -> dict:
+        scale, quality, fps = self.ladder[self.tier]
+        return {
+            "variant": self.variant,
+            "tier": self.tier,
+            "scale": scale,
+            "quality": quality,
+            "fps": round(1.0 / self.interval, 1),
+            "throughput_kbps": round(self.throughput * 8 / 1000, 1),
+            "sent_frames": self.sent_frames,
+            "sent_bytes": self.sent_bytes,
+            "queue": self.queue.stats()
+        }
@@ -0,0 +1,180 @@
+import sys
+import time
+import threading
+import cv2
+import numpy as np
+from adaptive_stream import StreamClient
+
+from vision.motion import MotionGate
+from vision.metrics import metrics
+
+PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+PART_TRAILER = b'\r\n'
+
+class FrameBroadcaster:
+    """Captures, runs detection and JPEG-encodes each camera frame once for every viewer.
+
+    Viewers subscribe to one of two variants: "annotated" frames with boxes drawn
+    by the server, or "raw" frames sent at a lower rate for clients that draw the
+    overlay themselves from detection events. A variant is only drawn and encoded
+    while someone is watching it.
+
+    The producer thread starts with the first subscriber and releases the camera
+    when the last one leaves. Each subscriber gets its own small latest-wins queue,
+    so a slow client skips frames instead of holding up the producer or other clients.
+
+    Every subscriber also carries its own scale, JPEG quality and frame rate (see
+    StreamClient). Frames are encoded once per setting in use, and not at all
+    when the picture has not visibly changed since the last encode.
+    """
+
+    def __init__(self, open_camera, load_model, detect, annotate, on_detections=None,
+                 queue_size: int = 2, raw_fps: float = 10.0, motion_gate: MotionGate = None):
+        self.open_camera = open_camera
+        self.load_model = load_model
+        self.detect = detect  # (model, frame, captured_at) -> DetectionBatch
+        self.annotate = annotate  # (frame, detections) -> frame with boxes drawn
+        self.on_detections = on_detections  # (frame_id, detections, frame, captured_at) -> None
+        self.queue_size = queue_size
+        self.raw_fps = raw_fps
+        self.motion_gate = motion_gate  # Skips detection while the view isn't changing
+        # Skips encoding a picture that hasn't visibly changed, re-sending it once a second
+        self._encode_gates = {variant: MotionGate(pixel_threshold=12, max_skip=1.0, size=(32, 24))
+                              for variant in ("annotated", "raw")}
+        self._resize_buffers = {}  # (height, width) -> reusable resize output
+        self.encodes = 0
+        self.unchanged_skips = 0
+        self.model = None  # Loaded once and kept across producer restarts
+        self.subscribers = {"annotated": [], "raw": []}
+        self.lock = threading.Lock()
+        self.running = False
+        self.frame_count = 0
+        self._thread = None
+
+    def subscribe(self, variant: str = "annotated") -> StreamClient:
+        max_fps = self.raw_fps if variant == "raw" else None
+        subscription = StreamClient(variant, queue_size=self.queue_size, max_fps=max_fps)
+        with self.lock:
+            self.subscribers[variant].append(subscription)
+            if not self.running:
+                self.running = True
+                self._thread = threading.Thread(target=self._run, name="broadcaster", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: StreamClient):
+        with self.lock:
+            for subscriptions in self.subscribers.values():
+                if subscription in subscriptions:
+                    subscriptions.remove(subscription)
+
+    def _encode(self, frame, scale: float, quality: int):
+        if scale != 1.0:
+            height, width = frame.shape[:2]
+            shape = (int(height * scale), int(width * scale), 3)
+            resized = self._resize_buffers.get(shape)
+            if resized is None:
+                resized = self._resize_buffers[shape] = np.empty(shape, dtype=np.uint8)
+            with metrics.timer("resize"):
+                frame = cv2.resize(frame, (shape[1], shape[0]), dst=resized, interpolation=cv2.INTER_AREA)
+
+        with metrics.timer("encode"):
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ret:
+            print("Frame encoding error: Failed to encode frame", file=sys.stderr)
+            return None
+        self.encodes += 1
+        # WSGI bodies must be bytes, so copy once, straight from the encoder output;
+        # every subscriber at this setting shares the same chunk
+        return b''.join((PART_HEADER, buffer, PART_TRAILER))
+
+    def _publish(self, variant: str, clients, frame, now: float):
+        due = [client for client in clients if client.due(now)]
+        if not due:
+            return
+        changed = self._encode_gates[variant].check(frame, now)
+        # Clients that have not received anything yet always get a frame
+        if not changed and all(client.last_put for client in due):
+            self.unchanged_skips += 1
+            return
+
+        parts = {}
+        for client in due:
+            setting = (client.scale, client.quality)
+            if setting not in parts:
+                parts[setting] = self._encode(frame, *setting)
+            if parts[setting] is not None:
+                client.deliver(parts[setting], now)
+
+    def _run(self):
+        cap = None
+        last_detections = None
+        try:
+            cap = self.open_camera()
+            if cap is None:
+                return
+            if self.model is None:
+                self.model = self.load_model()
+
+            while True:
+                with self.lock:
+                    if not any(self.subscribers.values()):
+                        # Release and mark stopped under the lock so a new subscriber
+                        # starts a fresh producer that can open the camera again
+                        cap.release()
+                        cap = None
+                        self.running = False
+                        break
+                    annotated_subscribers = list(self.subscribers["annotated"])
+                    raw_subscribers = list(self.subscribers["raw"])
+
+                with metrics.timer("capture"):
+                    ret, frame = cap.read()
+                captured_at = time.time()  # Stamped before inference so glass-to-ear includes detection
+                if not ret or frame is None:
+                    print("Failed to capture frame", file=sys.stderr)
+                    break
+
+                if (self.motion_gate is not None and last_detections is not None
+                        and not self.motion_gate.check(frame)):
+                    detections = last_detections.carry_forward(captured_at)
+                else:
+                    detections = self.detect(self.model, frame, captured_at)
+                    if detections is None:
+                        continue
+                    last_detections = detections
+                self.frame_count += 1
+                if self.on_detections is not None:
+                    self.on_detections(self.frame_count, detections, frame, captured_at)
+
+                now = time.monotonic()
+                if any(client.due(now) for client in annotated_subscribers):
+                    self._publish("annotated", annotated_subscribers,
+                                  self.annotate(frame.copy(), detections), now)
+                self._publish("raw", raw_subscribers, frame, now)
+
+        except Exception as e:
+            print(f"Error in broadcaster: {str(e)}", file=sys.stderr)
+
+        finally:
+            if cap is not None:
+                cap.release()
+            with self.lock:
+                # Remaining subscribers see running is False and end their streams,
+                # unless a newer producer has already taken over
+                if self._thread is threading.current_thread():
+                    self.running = False
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "running": self.running,
+                "frames": self.frame_count,
+                "encodes": self.encodes,
+                "unchanged_skips": self.unchanged_skips,
+                "motion": self.motion_gate.stats() if self.motion_gate is not None else None,
+                "subscribers": {
+                    variant: [subscription.stats() for subscription in subscriptions]
+                    for variant, subscriptions in self.subscribers.items()
+                }
+            }
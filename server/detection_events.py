@@ -0,0 +1,74 @@
+import threading
+import numpy as np
+from typing import Dict, List, Tuple
+
+from vision.detected_obj import DetectionBatch
+
+class DetectionDeltaEncoder:
+    """Turns each frame's detections into a compact record sent as a delta against the previous frame.
+
+    Boxes are quantized to `quantum` pixels and sent as rows of
+    [track_id, class_id, x1, y1, x2, y2] in quantized units. A delta record only
+    carries tracks that appeared or moved ("u") and the ids of tracks that left ("d"):
+
+        {"f": 412, "u": [[7, 0, 40, 22, 61, 90]], "d": [3]}
+
+    Every keyframe_interval frames, and whenever a client connects, a keyframe
+    with the full set of tracks and the frame geometry is sent instead:
+
+        {"f": 420, "k": 1, "w": 640, "h": 480, "q": 4, "u": [...]}
+
+    Untracked boxes (id -1) have nothing to diff against and are left out.
+    """
+
+    def __init__(self, quantum: int = 4, keyframe_interval: int = 30):
+        self.quantum = quantum
+        self.keyframe_interval = keyframe_interval
+        self.tracks: Dict[int, Tuple[int, int, int, int, int]] = {}  # id -> (class_id, qx1, qy1, qx2, qy2)
+        self.frame_id = 0
+        self.frame_size = (0, 0)
+        self.since_keyframe = 0
+        self.lock = threading.Lock()
+
+    def _rows(self, detections: DetectionBatch) -> Dict[int, Tuple[int, int, int, int, int]]:
+        tracked = detections.ids >= 0
+        boxes = np.rint(detections.xyxy[tracked] / self.quantum).astype(np.int32)
+        rows = np.column_stack([detections.class_ids[tracked], boxes]).tolist()
+        return {track_id: tuple(row) for track_id, row in zip(detections.ids[tracked].tolist(), rows)}
+
+    def _keyframe(self) -> dict:
+        width, height = self.frame_size
+        return {
+            "f": self.frame_id, "k": 1, "w": width, "h": height, "q": self.quantum,
+            "u": [[track_id, *row] for track_id, row in self.tracks.items()]
+        }
+
+    def encode(self, frame_id: int, detections: DetectionBatch, frame_size: Tuple[int, int]) -> dict:
+        """Record for this frame, or None when nothing changed since the previous one"""
+        current = self._rows(detections)
+        with self.lock:
+            previous = self.tracks
+            self.tracks = current
+            self.frame_id = frame_id
+            self.since_keyframe += 1
+            if frame_size != self.frame_size or self.since_keyframe >= self.keyframe_interval:
+                self.frame_size = frame_size
+                self.since_keyframe = 0
+                return self._keyframe()
+
+            updated: List[list] = [[track_id, *row] for track_id, row in current.items()
+                                   if previous.get(track_id) != row]
+            removed = [track_id for track_id in previous if track_id not in current]
+        if not updated and not removed:
+            return None
+        record = {"f": frame_id}
+        if updated:
+            record["u"] = updated
+        if removed:
+            record["d"] = removed
+        return record
+
+    def keyframe(self) -> dict:
+        """Full state for a client that just connected"""
+        with self.lock:
+            return self._keyframe()
@@ -0,0 +1,102 @@
+import time
+import threading
+from collections import deque
+
+from vision.priority_list import NavigationQueue
+from vision.summarizer import SummaryService
+
+class NavigationFeed:
+    """Runs the Scene -> NavigationQueue pipeline on the video loop's detections and keeps the messages it produces.
+
+    Every published message gets the next version number. Readers remember the
+    last version they saw and either wait() for a newer one (SSE and long-poll)
+    or compare it as an ETag (plain polling). Versions restart at 0 with every
+    feed, so a version newer than the current one is from a previous feed and
+    is read as 0, and epoch tells ETags from different feeds apart.
+    """
+
+    def __init__(self, scene, analysis_interval: float = 2.0, analysis_frame_skip: int = 3,
+                 history: int = 20):
+        self.scene = scene
+        self.nav_queue = NavigationQueue()  # Same TTL and dedup rules as the spoken output
+        self.summary_service = SummaryService(scene, self._on_summary).start()
+        self.analysis_interval = analysis_interval
+        self.analysis_frame_skip = analysis_frame_skip
+        self.tracking_buffer = deque(maxlen=5)
+        self.analysis_buffer = deque(maxlen=50)
+        self.last_analysis = time.time()
+        self.messages = deque(maxlen=history)
+        self.version = 0
+        self.epoch = format(time.time_ns(), "x")  # Distinguishes this feed's versions from a previous process's
+        self.cond = threading.Condition()
+        self.drain_lock = threading.Lock()
+
+    def on_detections(self, frame_id: int, detections, frame, captured_at: float = None):
+        """Broadcaster callback: feed one frame's detections through the scene analysis.
+        captured_at is the time.time() the frame was read from the camera"""
+        current_time = time.time() if captured_at is None else captured_at
+        self.scene.add_detections(current_time, detections)
+
+        self.tracking_buffer.append((frame, current_time))
+        self.scene.process_movement(self.tracking_buffer)
+        # Urgent hazards are published on this frame rather than after the next LLM round trip
+        hazards = [hazard for hazard in self.scene.detect_hazards(frame, current_time)
+                   if self.nav_queue.add_json_item(hazard)]
+        if hazards:
+            self._drain()
+
+        if frame_id % self.analysis_frame_skip == 0:
+            self.analysis_buffer.append((frame, current_time))
+        if current_time - self.last_analysis >= self.analysis_interval and self.analysis_buffer:
+            self.summary_service.submit(self.analysis_buffer)
+            self.last_analysis = current_time
+            self.analysis_buffer.clear()
+
+    def _on_summary(self, response: str, tag: str, captured_at: float):
+        if self.nav_queue.add_json_item(self.scene._format_for_priority_queue(response, tag, captured_at)):
+            self._drain()
+
+    def _drain(self):
+        # The UI shows every message at once, so drain straight away in priority order
+        with self.drain_lock:  # The video loop and the summary worker both publish
+            while True:
+                item = self.nav_queue.pop()
+                if item is None:
+                    break
+                self.publish(*item)
+                self.nav_queue.done()
+
+    def publish(self, message: str, priority: int, captured_at: float = None):
+        with self.cond:
+            self.version += 1
+            self.messages.append({
+                "id": self.version,
+                "message": message,
+                "priority": priority,
+                "time": time.time(),
+                "captured": captured_at  # Capture time of the frame the message is about
+            })
+            self.cond.notify_all()
+
+    def since(self, version: int):
+        """Current version and the messages newer than version"""
+        with self.cond:
+            if version > self.version:
+                version = 0  # Left over from before a restart
+            return self.version, [m for m in self.messages if m["id"] > version]
+
+    def wait(self, version: int, timeout: float):
+        """Block until a message newer than version exists or timeout passes"""
+        with self.cond:
+            if version > self.version:
+                version = 0  # Left over from before a restart: everything is new
+            self.cond.wait_for(lambda: self.version > version, timeout)
+        return self.since(version)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "llm": self.summary_service.stats(),
+            "nav": self.nav_queue.stats(),
+            "hazards": self.scene.hazards.stats()
+        }
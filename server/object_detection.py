@@ -1,11 +1,15 @@
+import os
 import cv2
 import sys
 import time
-from dataclasses import dataclass
-from typing import List, Tuple
-from ultralytics import YOLO
+import numpy as np
 from ultralytics.utils.plotting import Annotator, colors
 
+if __name__ == "__main__":  # Run on its own; server.py sets up the path when imported from there
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from vision.detected_obj import DetectionBatch
+from vision.models import registry
+
 def init_camera():
     cap = cv2.VideoCapture(1)
     time.sleep(5)
@@ -16,43 +20,34 @@ def init_camera():
         
     return cap
 
-@dataclass
-class DetectionContext:
-    object_id: int
-    class_name: str
-    position: str
-    confidence: float
-    bbox: Tuple[int, int, int, int]
+def process_frame(model, frame, names: np.ndarray, captured_at: float = None) -> DetectionBatch:
+    """Track one frame; detections are stamped with captured_at (time.time() at capture) when given"""
+    results = model.track(frame)
 
-def process_frame(model, frame) -> List[DetectionContext]:
-    results = model.track(frame, persist=True)
-    context = []
-    
-    if results[0].boxes.id is not None:
-        boxes = results[0].boxes
-        for box, track_id, conf, cls in zip(
-            boxes.xyxy,
-            boxes.id,
-            boxes.conf,
-            boxes.cls
-        ):
-            x1, y1, x2, y2 = box.int().tolist()
-            center_x = (x1 + x2) / 2
-            position = "left" if center_x < 320 else "right" if center_x > 320 else "center"
-            
-            context.append(DetectionContext(
-                object_id=int(track_id),
-                class_name=results[0].names[int(cls)],
-                position=position,
-                confidence=float(conf),
-                bbox=(x1, y1, x2, y2)
-            ))
-    
-    return context
+    if results[0].boxes.id is None:
+        return DetectionBatch.empty(names)
+    return DetectionBatch.from_boxes(results[0].boxes, names, time.time() if captured_at is None else captured_at)
+
+def draw_detections(frame, detections: DetectionBatch):
+    """Draw labelled boxes for a batch onto frame in place"""
+    annotator = Annotator(frame, line_width=2)
+    for bbox, object_id, class_name in zip(
+        detections.xyxy.astype(int).tolist(),
+        detections.ids.tolist(),
+        detections.class_names.tolist()
+    ):
+        color = colors(object_id, True)
+        annotator.box_label(
+            bbox, 
+            f"{class_name} {object_id}", 
+            color=color
+        )
+    return frame
 
 def main():
     cap = init_camera()
-    model = YOLO("yolo11n-seg.pt")
+    model = registry.handle("yolo11n-seg.pt")
+    names = model.names
     
     try:
         while True:
@@ -62,17 +57,10 @@ def main():
                 break
             
             # Process frame and get context
-            context = process_frame(model, frame)
+            context = process_frame(model, frame, names)
             
             # Visualize results
-            annotator = Annotator(frame, line_width=2)
-            for obj in context:
-                color = colors(obj.object_id, True)
-                annotator.box_label(
-                    obj.bbox, 
-                    f"{obj.class_name} {obj.object_id}", 
-                    color=color
-                )
+            draw_detections(frame, context)
             
             # Display frame
             cv2.imshow("Detection", frame)
@@ -88,4 +76,6 @@ def main():
 
 if __name__ == "__main__":
     for context in main():
-        print([f"{obj.class_name} {obj.object_id}: {obj.position}" for obj in context])
\ No newline at end of file
+        positions = context.position_labels(320, 320)
+        print([f"{name} {object_id}: {pos}" for name, object_id, pos in
+               zip(context.class_names.tolist(), context.ids.tolist(), positions.tolist())])
\ No newline at end of file
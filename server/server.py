@@ -1,11 +1,24 @@
-from ultralytics import YOLO
+import os
+import sys
+# The vision package lives in the repo root, next to this directory; set the path
+# up once here, before anything in the server imports from it
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 import cv2
 from flask_cors import CORS
 from flask import jsonify
 from flask_socketio import SocketIO, emit
-import numpy as np
-import sys
-from flask import Flask, Response
+import time
+from flask import Flask, Response, request
+from broadcaster import FrameBroadcaster
+from detection_events import DetectionDeltaEncoder
+from object_detection import process_frame, draw_detections
+from navigation_feed import NavigationFeed
+from vision.scene import Scene
+from vision.models import registry
+from vision.motion import MotionGate
+from vision.metrics import metrics
+import json
 
 app = Flask(__name__)
 CORS(app)
@@ -28,87 +41,83 @@ def init_camera():
 def handle_connect():
     print('Client connected', file=sys.stderr)
     emit('status', {'message': 'Connected to server'})
+    if names is not None:
+        emit('classes', {'names': names.tolist()})
+        emit('detections', detection_encoder.keyframe())
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected', file=sys.stderr)
 
-def process_frame(model, frame):
+# Track ids persist across frames so clients can diff detection events
+def detect_frame(model, frame, captured_at):
     try:
-        # Run YOLO detection
-        results = model(frame)
-        
-        # Get the plotted frame with detection boxes
-        processed_frame = results[0].plot()
-        
-        # Ensure the frame is a valid numpy array with correct data type
-        if not isinstance(processed_frame, np.ndarray):
-            raise ValueError("Processed frame is not a numpy array")
-            
-        # Ensure the frame is in BGR format (OpenCV default)
-        if len(processed_frame.shape) != 3 or processed_frame.shape[2] != 3:
-            raise ValueError("Frame must be a 3-channel BGR image")
-            
-        # Ensure the data type is uint8
-        if processed_frame.dtype != np.uint8:
-            processed_frame = processed_frame.astype(np.uint8)
-            
-        return processed_frame
-        
+        return process_frame(model, frame, names, captured_at)
     except Exception as e:
-        print(f"Error in process_frame: {str(e)}", file=sys.stderr)
+        print(f"Error in detect_frame: {str(e)}", file=sys.stderr)
         return None
 
-def gen_frames():
-    cap = None
+names = None  # Class name table of the loaded model
+navigation_feed = None  # Created with the model, which its Scene shares
+
+def load_model():
+    global names, navigation_feed
+    model = registry.handle("yolov8n.pt")  # Loaded and warmed up once per process
+    names = model.names
+    if navigation_feed is None:
+        navigation_feed = NavigationFeed(Scene(model=model))
+    socketio.emit('classes', {'names': names.tolist()})
+    return model
+
+detection_encoder = DetectionDeltaEncoder()
+
+def publish_detections(frame_id, detections, frame, captured_at):
+    record = detection_encoder.encode(frame_id, detections, (frame.shape[1], frame.shape[0]))
+    if record is not None:
+        socketio.emit('detections', record)
+    if navigation_feed is not None:
+        navigation_feed.on_detections(frame_id, detections, frame, captured_at)
+
+# One capture/inference/encode loop shared by every /video_feed client
+broadcaster = FrameBroadcaster(init_camera, load_model, detect_frame, draw_detections,
+                               on_detections=publish_detections, motion_gate=MotionGate())
+
+def gen_frames(variant):
+    subscription = broadcaster.subscribe(variant)
     try:
-        cap = init_camera()
-        model = YOLO("yolov8n.pt")
-        
         while True:
-            ret, frame = cap.read()
-            if not ret or frame is None:
-                print("Failed to capture frame", file=sys.stderr)
-                break
-                
-            # Process frame with YOLO
-            processed_frame = process_frame(model, frame)
-            
-            # Ensure we have a valid frame before encoding
-            if processed_frame is not None:
-                try:
-                    # Verify frame format
-                    if not isinstance(processed_frame, np.ndarray):
-                        raise ValueError("Frame must be a numpy array")
-                        
-                    # Attempt to encode the frame
-                    ret, buffer = cv2.imencode('.jpg', processed_frame)
-                    if not ret:
-                        raise RuntimeError("Failed to encode frame")
-                        
-                    frame_bytes = buffer.tobytes()
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                           
-                except Exception as e:
-                    print(f"Frame encoding error: {str(e)}", file=sys.stderr)
-                    continue
-                    
+            part = subscription.get(timeout=1.0)
+            if part is None:
+                if not broadcaster.running:
+                    break
+                continue
+            # The server writes the part to the socket before resuming us, so
+            # the time spent here is how long the client took to accept it
+            sent_at = time.monotonic()
+            yield part
+            subscription.record_send(len(part), time.monotonic() - sent_at)
+
     except Exception as e:
         print(f"Error in gen_frames: {str(e)}", file=sys.stderr)
         
     finally:
-        if cap is not None:
-            cap.release()
+        broadcaster.unsubscribe(subscription)
 
 @app.route('/')
 def index():
-    return jsonify({"status": "running"})
+    return jsonify({"status": "running", "models": registry.stats(), "stream": broadcaster.stats()})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/video_feed')
 def video_feed():
+    # ?overlay=client streams unannotated frames at a lower rate; the client
+    # draws boxes from 'detections' events instead
+    variant = "raw" if request.args.get('overlay') == 'client' else "annotated"
     return Response(
-        gen_frames(),
+        gen_frames(variant),
         mimetype='multipart/x-mixed-replace; boundary=frame',
         headers={
             'Access-Control-Allow-Origin': '*',
@@ -120,17 +129,56 @@ def video_feed():
 
 @app.route('/api/environment-messages')
 def environment_messages():
-    return jsonify({
-        "messages": [
-            "Person detected in front",
-            "Car approaching from left",
-            "Door ahead",
-            "Clear path forward"
-        ]
-    }), 200, {
+    """Navigation messages newer than ?since=<version>.
+
+    With ?wait=<seconds> the request is held until a newer message exists
+    (long-poll). Plain polls can send If-None-Match with the last ETag and get
+    304 while nothing has changed.
+    """
+    headers = {'Access-Control-Allow-Origin': '*', 'Access-Control-Expose-Headers': 'ETag'}
+    since = request.args.get('since', default=0, type=int)
+    wait = min(request.args.get('wait', default=0.0, type=float), 30.0)
+
+    if navigation_feed is None:
+        version, messages = 0, []
+    elif wait > 0:
+        version, messages = navigation_feed.wait(since, wait)
+    else:
+        version, messages = navigation_feed.since(since)
+
+    # The epoch keeps a stale ETag from before a restart from matching a new feed's version
+    etag = f'"{navigation_feed.epoch if navigation_feed is not None else 0}-{version}"'
+    headers['ETag'] = etag
+    if request.headers.get('If-None-Match') == etag:
+        return '', 304, headers
+    return jsonify({"version": version, "messages": messages}), 200, headers
+
+@app.route('/api/environment-messages/stream')
+def environment_messages_stream():
+    """Server-Sent Events: one event per navigation message as soon as it is published"""
+    last_id = request.headers.get('Last-Event-ID', type=int) or request.args.get('since', default=0, type=int)
+
+    def events(version):
+        yield 'retry: 1000\n\n'
+        while True:
+            if navigation_feed is None:
+                time.sleep(1.0)
+                yield ': waiting for camera\n\n'
+                continue
+            version_now, messages = navigation_feed.wait(version, 15.0)
+            if not messages:
+                yield ': keepalive\n\n'  # Lets proxies and dead clients notice the connection
+                continue
+            for message in messages:
+                yield f"id: {message['id']}\ndata: {json.dumps(message)}\n\n"
+            version = version_now
+
+    return Response(events(last_id), mimetype='text/event-stream', headers={
         'Access-Control-Allow-Origin': '*',
-        'Content-Type': 'application/json'
-    }
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5003)
 
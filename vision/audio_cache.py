@@ -0,0 +1,197 @@
+import os
+import sys
+import hashlib
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "IASSIST_AUDIO_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrase_cache")
+)
+
+# Phrases worth synthesizing ahead of time, on top of priority_list.navigation_data
+COMMON_PHRASES = [
+    "Path clear",
+    "Path is clear",
+    "No data available",
+]
+COMMON_OBJECTS = ["person", "car", "bicycle", "chair", "dog", "bench", "bus", "truck", "motorcycle"]
+POSITIONS = ["left", "center", "right"]
+
+class AudioCache:
+    """LRU cache of synthesized speech keyed by (text, voice, speed).
+
+    Every entry is also written to cache_dir as a float32 .npy file and read
+    back memory-mapped, so phrases synthesized in earlier sessions (or by the
+    build step below) play without running the TTS model. max_bytes bounds the
+    audio kept mapped at once and max_disk_bytes the files in cache_dir: once
+    it is exceeded the least recently used files are deleted, so one-off LLM
+    sentences don't pile up over a long session.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = 64 * 1024 * 1024,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()  # key -> float32 audio, most recently used last
+        self.bytes = 0
+        self.files = OrderedDict()  # path -> size on disk, most recently used last
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.removed = 0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Pick up files left by earlier sessions, oldest use first"""
+        found = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self.files[path] = size
+            self.disk_bytes += size
+        self._trim_disk()
+
+    def _touch(self, path: str):
+        if path in self.files:
+            self.files.move_to_end(path)
+        try:
+            os.utime(path)  # mtime records last use, so the order survives restarts
+        except OSError:
+            pass
+
+    def _trim_disk(self):
+        while self.disk_bytes > self.max_disk_bytes and len(self.files) > 1:
+            path, size = self.files.popitem(last=False)
+            self.disk_bytes -= size
+            try:
+                os.remove(path)  # Already mapped copies stay readable until they are dropped
+                self.removed += 1
+            except OSError as e:
+                logger.warning(f"Could not remove audio cache file {path}: {e}")
+
+    def _key(self, text: str, voice: str, speed: float) -> Tuple[str, str, float]:
+        return (" ".join(text.split()), voice, round(float(speed), 2))
+
+    def _path(self, key: Tuple[str, str, float]) -> str:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.npy")
+
+    def _insert(self, key, audio: np.ndarray):
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key).nbytes
+        self.entries[key] = audio
+        self.bytes += audio.nbytes
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+
+    def get(self, text: str, voice: str, speed: float = 1.0) -> Optional[np.ndarray]:
+        """Return cached audio for the phrase, or None"""
+        key = self._key(text, voice, speed)
+        with self.lock:
+            audio = self.entries.get(key)
+            path = self._path(key)
+            if audio is not None:
+                self.entries.move_to_end(key)
+                if path in self.files:
+                    self.files.move_to_end(path)
+                self.hits += 1
+                return audio
+
+            if os.path.exists(path):
+                try:
+                    audio = np.load(path, mmap_mode="r")
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable audio cache file {path}: {e}")
+                else:
+                    self._insert(key, audio)
+                    self._touch(path)
+                    self.hits += 1
+                    return audio
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, voice: str, speed: float, audio: np.ndarray) -> np.ndarray:
+        """Store audio for the phrase in memory and on disk, returning the cached array"""
+        key = self._key(text, voice, speed)
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        path = self._path(key)
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, audio)
+            os.replace(tmp_path, path)  # Readers never see a half-written file
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"Could not write audio cache file {path}: {e}")
+            size = None
+
+        with self.lock:
+            self._insert(key, audio)
+            if size is not None:
+                self.disk_bytes += size - self.files.pop(path, 0)
+                self.files[path] = size
+                self._trim_disk()
+        return audio
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "disk_bytes": self.disk_bytes,
+            "removed": self.removed,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+def default_phrases() -> Iterable[str]:
+    from .priority_list import navigation_data
+    phrases = list(COMMON_PHRASES) + list(navigation_data)
+    for obj in COMMON_OBJECTS:
+        for pos in POSITIONS:
+            phrases.append(f"{obj} on {pos}")
+    return phrases
+
+def build_phrase_pack(phrases: Iterable[str] = None, cache_dir: str = DEFAULT_CACHE_DIR) -> int:
+    """Pre-synthesize phrases into the on-disk cache. Returns the number of new phrases"""
+    from .tts import TTSProcessor
+
+    tts_processor = TTSProcessor(audio_cache=AudioCache(cache_dir))
+    if tts_processor.pipeline is None:
+        return 0
+
+    built = 0
+    for phrase in phrases or default_phrases():
+        if tts_processor.audio_cache.get(phrase, tts_processor.voice, tts_processor.speed) is not None:
+            continue
+        if tts_processor.synthesize(phrase) is not None:
+            built += 1
+    logger.info(f"Phrase pack: {built} new phrases in {cache_dir}")
+    return built
+
+if __name__ == "__main__":
+    # Run once after installing: python -m vision.audio_cache [phrases.txt]
+    logging.basicConfig(level=logging.INFO)
+    phrases = None
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            phrases = [line.strip() for line in f if line.strip()]
+    build_phrase_pack(phrases)
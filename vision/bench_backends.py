@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import numpy as np
+from typing import List, Tuple
+from .models import ModelRegistry, BACKENDS, DEFAULT_WEIGHTS
+
+def load_images(directory: str = None, size: Tuple[int, int] = (640, 480)) -> List[np.ndarray]:
+    """Images to benchmark on, resized to the deployment resolution.
+    Defaults to the sample images that ship with ultralytics"""
+    import cv2
+    if directory is None:
+        from ultralytics.utils import ASSETS
+        directory = str(ASSETS)
+    images = []
+    for name in sorted(os.listdir(directory)):
+        image = cv2.imread(os.path.join(directory, name))
+        if image is not None:
+            images.append(cv2.resize(image, size))
+    return images
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (n, 4) and (m, 4) xyxy boxes"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+def map50(reference: List[Tuple[np.ndarray, np.ndarray]], candidate: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+          iou_threshold: float = 0.5) -> float:
+    """mAP@0.5 of candidate detections, scored against the reference detections as ground truth.
+
+    reference holds (xyxy, class_ids) per image and candidate (xyxy, class_ids, confidences).
+    """
+    classes = np.unique(np.concatenate([cls for _, cls in reference])) if reference else []
+    precisions = []
+    for class_id in classes:
+        scores, hits = [], []
+        total = 0
+        for (ref_boxes, ref_cls), (boxes, cls, conf) in zip(reference, candidate):
+            truth = ref_boxes[ref_cls == class_id]
+            total += len(truth)
+            mine = cls == class_id
+            order = np.argsort(-conf[mine])
+            predicted = boxes[mine][order]
+            matched = np.zeros(len(truth), dtype=bool)
+            ious = box_iou(predicted, truth) if len(truth) and len(predicted) else np.zeros((len(predicted), 0))
+            for row, score in zip(ious, conf[mine][order]):
+                row = np.where(matched, 0, row)
+                best = int(np.argmax(row)) if len(row) else -1
+                hit = best >= 0 and row[best] >= iou_threshold
+                if hit:
+                    matched[best] = True
+                scores.append(score)
+                hits.append(hit)
+
+        # All-point interpolated area under the precision/recall curve
+        order = np.argsort(-np.asarray(scores))
+        tp = np.cumsum(np.asarray(hits, dtype=float)[order])
+        recall = np.concatenate([[0.0], tp / max(total, 1), [1.0]])
+        precision = np.concatenate([[1.0], tp / np.arange(1, len(tp) + 1), [0.0]])
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        precisions.append(float(np.sum((recall[1:] - recall[:-1]) * precision[1:])))
+    return float(np.mean(precisions)) if precisions else 1.0
+
+def run(registry: ModelRegistry, backend: str, images: List[np.ndarray], weights: str, repeats: int):
+    """Latency per frame, plus every image's detections for the accuracy comparison"""
+    handle = registry.handle(weights, backend=backend)
+    latencies = []
+    detections = []
+    for repeat in range(repeats):
+        for image in images:
+            start = time.perf_counter()
+            result = handle.predict(image)[0]
+            latencies.append(time.perf_counter() - start)
+            if repeat == 0:
+                boxes = result.boxes
+                detections.append((boxes.xyxy.cpu().numpy(), boxes.cls.cpu().numpy(), boxes.conf.cpu().numpy()))
+    return np.asarray(latencies), detections
+
+def main(backends: List[str] = None, image_dir: str = None, weights: str = DEFAULT_WEIGHTS, repeats: int = 20):
+    backends = backends or list(BACKENDS)
+    images = load_images(image_dir)
+    if not images:
+        print("No images to benchmark on")
+        return
+
+    registry = ModelRegistry()
+    baseline = None
+    print(f"{len(images)} images x {repeats} repeats, weights {weights}")
+    print(f"{'backend':15s} {'load s':>7s} {'warmup s':>8s} {'p50 ms':>7s} {'p95 ms':>7s} {'fps':>6s} {'mAP50 vs torch':>15s}")
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        try:
+            latencies, detections = run(registry, backend, images, weights, repeats)
+        except Exception as e:
+            print(f"{backend:15s} unavailable: {e}")
+            continue
+        if baseline is None:
+            baseline = [(boxes, cls) for boxes, cls, _ in detections]
+        shared = registry.get(weights, backend=backend)
+        agreement = map50(baseline, detections)
+        print(f"{backend:15s} {shared.load_time:7.2f} {shared.warmup_time:8.2f} "
+              f"{np.percentile(latencies, 50) * 1000:7.1f} {np.percentile(latencies, 95) * 1000:7.1f} "
+              f"{1.0 / latencies.mean():6.1f} {agreement:15.3f}")
+
+if __name__ == "__main__":
+    # python -m vision.bench_backends [backend ...] [--images DIR]
+    args = sys.argv[1:]
+    image_dir = None
+    if "--images" in args:
+        index = args.index("--images")
+        image_dir = args[index + 1]
+        del args[index:index + 2]
+    main(args or None, image_dir)
@@ -0,0 +1,74 @@
+import time
+import random
+from .priority_list import NavigationQueue, navigation_data
+
+class ListNavigationQueue:
+    """The original list-based queue, kept only as a benchmark baseline.
+    max_size generalizes its hard-coded cap of 3 so both can be compared at larger depths"""
+    def __init__(self, max_size: int = 3):
+        self.max_size = max_size
+        self.queue = []
+        self.interrupted_item = None
+        self.interrupted = False
+
+    def sort_queue(self):
+        self.queue.sort(key=lambda x: x[1], reverse=True)
+        if len(self.queue) > self.max_size:
+            self.queue = [item for item in self.queue if item[1] > 1][:self.max_size]
+
+    def insert_with_priority(self, item):
+        message, priority = item
+        if priority == 3:
+            self.interrupted = True
+            if self.interrupted_item:
+                self.queue.insert(0, self.interrupted_item)
+                self.interrupted_item = None
+            self.queue.insert(0, item)
+        elif priority == 2:
+            insert_pos = 0
+            while (insert_pos < len(self.queue) and
+                   self.queue[insert_pos][1] == 3):
+                insert_pos += 1
+            self.queue.insert(insert_pos, item)
+        else:
+            self.queue.append(item)
+        self.sort_queue()
+
+    def pop(self):
+        return self.queue.pop(0) if self.queue else None
+
+def make_workload(n: int, insert_ratio: float = 0.7, seed: int = 0):
+    """Random mix of inserts (50% priority 1, 30% priority 2, 20% priority 3) and pops"""
+    rng = random.Random(seed)
+    ops = []
+    for _ in range(n):
+        if rng.random() < insert_ratio:
+            message = f"{rng.choice(navigation_data)} {rng.randint(0, 50)}"
+            ops.append((message, rng.choices([1, 2, 3], weights=[5, 3, 2])[0]))
+        else:
+            ops.append(None)
+    return ops
+
+def run(queue, ops) -> float:
+    start = time.perf_counter()
+    for op in ops:
+        if op is None:
+            queue.pop()
+        else:
+            queue.insert_with_priority(op)
+    return time.perf_counter() - start
+
+def main(n: int = 50000):
+    ops = make_workload(n)
+    # Queue depths: the production cap, then backlogs where per-op cost starts to matter
+    for max_size in (3, 64, 1024):
+        results = {
+            "list": run(ListNavigationQueue(max_size), ops),
+            "deque": run(NavigationQueue(initial_size=max_size, dedup_window=0.0), ops),
+            "deque+dedup": run(NavigationQueue(initial_size=max_size), ops)
+        }
+        for name, elapsed in results.items():
+            print(f"max_size={max_size:<5d} {name:12s} {elapsed * 1e9 / n:8.0f} ns/op")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,187 @@
-from .imports import *
+import numpy as np
+from typing import Iterator, Sequence, Tuple, Union
+
 
-@dataclass
 class DetectedObject:
-    object_id: int
-    class_name: str
-    confidence: float
-    position: Tuple[float, float]  # (x, y) center in pixels
-    size: Tuple[float, float]      # (width, height) in pixels
-    last_seen: float
-    frequency: int = 1
-    movement: Tuple[float, float] = (0.0, 0.0)  # (dx, dy)
+    """Read-only view of a single row in a DetectionBatch"""
+    __slots__ = ("batch", "index")
+
+    def __init__(self, batch: "DetectionBatch", index: int):
+        self.batch = batch
+        self.index = index
+
+    @property
+    def object_id(self) -> int:
+        return int(self.batch.ids[self.index])
+
+    @property
+    def class_name(self) -> str:
+        return str(self.batch.names[self.batch.class_ids[self.index]])
+
+    @property
+    def confidence(self) -> float:
+        return float(self.batch.confidences[self.index])
+
+    @property
+    def position(self) -> Tuple[float, float]:
+        """(x, y) center in pixels"""
+        x1, y1, x2, y2 = self.batch.xyxy[self.index].tolist()
+        return ((x1 + x2) / 2, (y1 + y2) / 2)
+
+    @property
+    def size(self) -> Tuple[float, float]:
+        """(width, height) in pixels"""
+        x1, y1, x2, y2 = self.batch.xyxy[self.index].tolist()
+        return (x2 - x1, y2 - y1)
+
+    @property
+    def last_seen(self) -> float:
+        return float(self.batch.timestamps[self.index])
+
+    @property
+    def frequency(self) -> int:
+        return int(self.batch.frequency[self.index])
+
+    @property
+    def movement(self) -> Tuple[float, float]:
+        """(dx, dy) since the previous sighting"""
+        dx, dy = self.batch.movement[self.index].tolist()
+        return (dx, dy)
 
     def get_position(self) -> Tuple[float, float, float, float]:
         """Return bbox coordinates (x1, y1, x2, y2)"""
-        x, y = self.position
-        w, h = self.size
-        return (x - w/2, y - h/2, x + w/2, y + h/2)
-    
+        x1, y1, x2, y2 = self.batch.xyxy[self.index].tolist()
+        return (x1, y1, x2, y2)
+
+
+class DetectionBatch:
+    """Detections stored as contiguous arrays (one row per box) instead of one object per box.
+
+    Rows are kept sorted by class id so that filtering by class returns slices,
+    which are views onto the same memory rather than copies.
+    """
+    __slots__ = ("ids", "class_ids", "confidences", "xyxy", "timestamps", "names",
+                 "frequency", "movement")
+
+    def __init__(self, ids: np.ndarray, class_ids: np.ndarray, confidences: np.ndarray,
+                 xyxy: np.ndarray, timestamps: np.ndarray, names: np.ndarray,
+                 frequency: np.ndarray = None, movement: np.ndarray = None, sort: bool = True):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.class_ids = np.asarray(class_ids, dtype=np.int64)
+        self.confidences = np.asarray(confidences, dtype=np.float32)
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.names = names  # Shared class name table, indexed by class id
+        n = len(self.ids)
+        self.frequency = np.ones(n, dtype=np.int32) if frequency is None else np.asarray(frequency, dtype=np.int32)
+        self.movement = np.zeros((n, 2), dtype=np.float32) if movement is None else np.asarray(movement, dtype=np.float32)
+
+        if sort and n > 1 and np.any(self.class_ids[1:] < self.class_ids[:-1]):
+            order = np.argsort(self.class_ids, kind="stable")
+            for name in ("ids", "class_ids", "confidences", "xyxy", "timestamps", "frequency", "movement"):
+                setattr(self, name, getattr(self, name)[order])
+
+    @classmethod
+    def empty(cls, names: np.ndarray) -> "DetectionBatch":
+        return cls(np.empty(0), np.empty(0), np.empty(0), np.empty((0, 4)), np.empty(0), names)
+
+    @classmethod
+    def from_boxes(cls, boxes, names: np.ndarray, timestamp: float) -> "DetectionBatch":
+        """Build a batch from an ultralytics Boxes object. Untracked boxes get id -1"""
+        n = len(boxes)
+        ids = np.full(n, -1) if boxes.id is None else boxes.id.cpu().numpy()
+        return cls(
+            ids,
+            boxes.cls.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            boxes.xyxy.cpu().numpy(),
+            np.full(n, timestamp),
+            names
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["DetectionBatch"], names: np.ndarray) -> "DetectionBatch":
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty(names)
+        if len(batches) == 1:
+            return batches[0]
+        return cls(
+            np.concatenate([b.ids for b in batches]),
+            np.concatenate([b.class_ids for b in batches]),
+            np.concatenate([b.confidences for b in batches]),
+            np.concatenate([b.xyxy for b in batches]),
+            np.concatenate([b.timestamps for b in batches]),
+            names,
+            np.concatenate([b.frequency for b in batches]),
+            np.concatenate([b.movement for b in batches])
+        )
+
+    def carry_forward(self, timestamp: float) -> "DetectionBatch":
+        """The same boxes seen again at timestamp, for frames the detector skipped"""
+        return DetectionBatch(
+            self.ids, self.class_ids, self.confidences, self.xyxy, np.full(len(self), timestamp),
+            self.names, sort=False
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> DetectedObject:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return DetectedObject(self, index % len(self))
+
+    def __iter__(self) -> Iterator[DetectedObject]:
+        for index in range(len(self)):
+            yield DetectedObject(self, index)
+
+    @property
+    def centers(self) -> np.ndarray:
+        return (self.xyxy[:, :2] + self.xyxy[:, 2:]) / 2
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return self.xyxy[:, 2:] - self.xyxy[:, :2]
+
+    @property
+    def class_names(self) -> np.ndarray:
+        return self.names[self.class_ids]
+
+    def position_labels(self, left: float = 213, right: float = 426) -> np.ndarray:
+        """Horizontal position ("left"/"center"/"right") of every box center"""
+        xs = self.centers[:, 0]
+        return np.where(xs < left, "left", np.where(xs > right, "right", "center"))
+
+    def _slice(self, index: Union[slice, np.ndarray]) -> "DetectionBatch":
+        return DetectionBatch(
+            self.ids[index], self.class_ids[index], self.confidences[index], self.xyxy[index],
+            self.timestamps[index], self.names, self.frequency[index], self.movement[index], sort=False
+        )
+
+    def of_class(self, class_id: Union[int, str]) -> "DetectionBatch":
+        """Rows of one class, as views onto this batch's arrays"""
+        if isinstance(class_id, str):
+            matches = np.flatnonzero(self.names == class_id)
+            if not len(matches):
+                return self._slice(slice(0, 0))
+            class_id = int(matches[0])
+        start, stop = np.searchsorted(self.class_ids, [class_id, class_id + 1])
+        return self._slice(slice(start, stop))
+
+    def region_indices(self, x1: float, y1: float, x2: float, y2: float) -> np.ndarray:
+        """Row indices of boxes whose center falls inside the given region, without copying any rows"""
+        xs = (self.xyxy[:, 0] + self.xyxy[:, 2]) / 2
+        ys = (self.xyxy[:, 1] + self.xyxy[:, 3]) / 2
+        return np.flatnonzero((xs >= x1) & (xs < x2) & (ys >= y1) & (ys < y2))
+
+    def in_region(self, x1: float, y1: float, x2: float, y2: float) -> "DetectionBatch":
+        """Rows whose box center falls inside the given region, as a new batch.
+
+        Unlike of_class this copies the selected rows, since a region's rows are
+        not contiguous; use region_indices to index the arrays directly instead.
+        """
+        return self._slice(self.region_indices(x1, y1, x2, y2))
+
+    def select(self, mask: np.ndarray) -> "DetectionBatch":
+        return self._slice(mask)
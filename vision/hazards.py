@@ -0,0 +1,110 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from .detected_obj import DetectionBatch
+from .tracks import TrackHistory
+
+# How dangerous each class is to walk into, 0-1. Anything not listed gets DEFAULT_RISK
+CLASS_RISK = {
+    "car": 1.0, "truck": 1.0, "bus": 1.0, "train": 1.0, "motorcycle": 0.9,
+    "bicycle": 0.7, "horse": 0.6, "dog": 0.5, "person": 0.4,
+    "fire hydrant": 0.4, "bench": 0.35, "chair": 0.3, "dining table": 0.3, "potted plant": 0.3,
+    "stop sign": 0.2, "traffic light": 0.2,
+}
+DEFAULT_RISK = 0.2
+
+class HazardEvaluator:
+    """Scores every tracked detection for danger in one pass of array math and turns
+    the worst into navigation messages without waiting for the LLM.
+
+    A detection's score is its class risk, times how close it is (box area, or
+    time to contact when it is approaching), times how near it is to the corridor
+    straight ahead. Objects moving sideways into the corridor count as if they
+    were already a little closer to it.
+    """
+
+    def __init__(self, names: np.ndarray, emergency_threshold: float = 0.7, high_threshold: float = 0.4,
+                 cooldown: float = 4.0, max_messages: int = 1):
+        self.risk = np.array([CLASS_RISK.get(str(name), DEFAULT_RISK) for name in names], dtype=np.float32)
+        self.emergency_threshold = emergency_threshold
+        self.high_threshold = high_threshold
+        self.full_size = 0.25  # Fraction of the frame a box fills when it is as close as it gets
+        self.ttc_horizon = 3.0  # Seconds to contact below which an approach starts to count
+        self.corridor = 0.25  # Half-width of the walking corridor, as a fraction of half the frame
+        self.cooldown = cooldown  # Seconds before the same object is announced again at the same level
+        self.max_messages = max_messages  # Hazards announced per frame
+        self.announced: Dict[Tuple, Tuple[float, int]] = {}  # key -> (time, priority)
+        self.evaluated = 0
+        self.raised = {3: 0, 2: 0}
+
+    def score(self, detections: DetectionBatch, tracks: TrackHistory, width: int, height: int) -> Dict[str, np.ndarray]:
+        """Per-row hazard score plus the terms it was built from"""
+        n = len(detections)
+        sizes = detections.sizes
+        centers = detections.centers
+        size_term = np.clip(sizes[:, 0] * sizes[:, 1] / float(width * height) / self.full_size, 0, 1)
+
+        ttc = np.full(n, np.inf)
+        lateral = np.zeros(n, dtype=np.float32)
+        tracked = detections.ids >= 0
+        if tracked.any():
+            estimate = tracks.estimate(detections.ids[tracked])
+            ttc[tracked] = estimate["time_to_contact"]
+            lateral[tracked] = estimate["velocity"][:, 0]
+        ttc_term = np.clip(1 - ttc / self.ttc_horizon, 0, 1)
+
+        # Distance from the corridor, reduced for objects moving toward it (one second ahead)
+        half = width / 2.0
+        offset = (centers[:, 0] - half) / half
+        toward = np.sign(-offset) * lateral / half
+        offset = np.abs(offset) - np.clip(toward, 0, None)
+        corridor_term = np.clip(1 - (offset - self.corridor) / (1 - self.corridor), 0, 1)
+
+        score = self.risk[detections.class_ids] * np.maximum(size_term, ttc_term) * corridor_term
+        return {"score": score, "ttc": ttc, "approaching": ttc_term > 0}
+
+    def evaluate(self, detections: DetectionBatch, tracks: TrackHistory, width: int, height: int,
+                 captured_at: float = None) -> List[Tuple[str, int, Optional[float]]]:
+        """Navigation queue items for the most dangerous objects in this frame"""
+        self.evaluated += 1
+        if not len(detections):
+            return []
+        terms = self.score(detections, tracks, width, height)
+        score = terms["score"]
+        priority = np.where(score >= self.emergency_threshold, 3, np.where(score >= self.high_threshold, 2, 0))
+        candidates = np.flatnonzero(priority)
+        if not len(candidates):
+            return []
+
+        now = float(detections.timestamps.max())  # Frame time, so replays cool down in recording time
+        positions = detections.position_labels(width / 3, 2 * width / 3)
+        items = []
+        for index in candidates[np.argsort(-score[candidates])].tolist():
+            level = int(priority[index])
+            name = str(detections.names[detections.class_ids[index]])
+            position = str(positions[index])
+            object_id = int(detections.ids[index])
+            key = (object_id,) if object_id >= 0 else (name, position)
+            last = self.announced.get(key)
+            if last is not None and now - last[0] < self.cooldown and last[1] >= level:
+                continue
+            self.announced[key] = (now, level)
+            self.raised[level] += 1
+
+            where = "ahead" if position == "center" else f"on your {position}"
+            if terms["approaching"][index]:
+                where = f"approaching {where}"
+            message = f"{'Stop' if level == 3 else 'Caution'}, {name} {where}"
+            items.append((message, level, captured_at))
+            if len(items) >= self.max_messages:
+                break
+
+        if len(self.announced) > 256:
+            self.announced = {key: value for key, value in self.announced.items() if now - value[0] < self.cooldown}
+        return items
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "evaluated": self.evaluated,
+            "emergency": self.raised[3],
+            "high": self.raised[2]
+        }
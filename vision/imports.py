@@ -1,15 +1,16 @@
 import cv2
 import time
+import threading
 import numpy as np
 from collections import defaultdict
 import os
 from ultralytics import YOLO
 from dataclasses import dataclass, field
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Callable
 import requests
 import re
 import ollama
-from collections import deque
+from collections import deque, OrderedDict
 from ultralytics.utils.plotting import Annotator, colors
 import os
 from groq import Groq
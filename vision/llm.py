@@ -0,0 +1,215 @@
+import json
+from typing import Iterator
+from .imports import *
+from requests.adapters import HTTPAdapter
+
+DEFAULT_LLM = os.environ.get("IASSIST_LLM", "groq")
+
+class LLMBackend:
+    """Turns a prompt into a completion. Backends keep their connections open
+    between calls so only the first summary pays for setup."""
+
+    name = "base"
+
+    def __init__(self, model: str, timeout: float = 5.0):
+        self.model = model
+        self.timeout = timeout
+        self.requests = 0
+        self.errors = 0
+
+    def complete(self, prompt: str, timeout: float = None) -> str:
+        """Completion text for prompt, raising on network errors and timeouts"""
+        self.requests += 1
+        try:
+            return self._complete(prompt, timeout or self.timeout)
+        except Exception:
+            self.errors += 1
+            raise
+
+    def _complete(self, prompt: str, timeout: float) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, timeout: float = None) -> Iterator[str]:
+        """Completion text as it is generated. Closing the generator early abandons the rest"""
+        self.requests += 1
+        try:
+            yield from self._stream(prompt, timeout or self.timeout)
+        except Exception:
+            self.errors += 1
+            raise
+
+    def _stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        # Backends that can't stream hand over the whole completion at once
+        yield self._complete(prompt, timeout)
+
+    def warm(self):
+        """Get the backend ready to answer quickly. Safe to call from a background thread"""
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": self.name,
+            "model": self.model,
+            "requests": self.requests,
+            "errors": self.errors
+        }
+
+class GroqBackend(LLMBackend):
+    """Hosted Groq chat completions"""
+
+    name = "groq"
+
+    def __init__(self, model: str = "llama-3.2-3b-preview", base_url: str = None, timeout: float = 5.0):
+        super().__init__(model, timeout)
+        self.base_url = base_url or os.environ.get("GROQ_BASE_URL")  # Point at a stand-in server for tests
+        self.client = None
+        self.client_lock = threading.Lock()
+
+    def _get_client(self) -> Groq:
+        """Create the Groq client once so its connection pool is reused across calls"""
+        with self.client_lock:
+            if self.client is None:
+                self.client = Groq(
+                    api_key=os.environ.get("GROQ_API_KEY"),
+                    base_url=self.base_url,
+                    timeout=self.timeout,
+                    max_retries=0  # A late summary is useless, don't retry past the deadline
+                )
+            return self.client
+
+    def _complete(self, prompt: str, timeout: float) -> str:
+        chat_completion = self._get_client().chat.completions.create(
+            messages=[{'role': 'user', 'content': prompt}],
+            model=self.model,
+            timeout=timeout
+        )
+        return chat_completion.choices[0].message.content
+
+    def _stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        stream = self._get_client().chat.completions.create(
+            messages=[{'role': 'user', 'content': prompt}],
+            model=self.model,
+            timeout=timeout,
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.response.close()
+
+    def warm(self):
+        self._get_client()
+
+class OllamaBackend(LLMBackend):
+    """Local Ollama (or anything speaking its /api/chat protocol) over one pooled HTTP session.
+
+    keep_alive is sent with every request so the model stays loaded between
+    summaries, warm() loads it before the first one, and at most max_concurrent
+    requests are in flight so a slow box isn't handed a growing backlog.
+    Warm-up doesn't take a request slot; requests made while it runs wait for
+    it, but no longer than their own timeout.
+    """
+
+    name = "ollama"
+
+    def __init__(self, model: str = None, host: str = None, timeout: float = 5.0,
+                 keep_alive: str = "30m", max_concurrent: int = 1, max_tokens: int = 48):
+        super().__init__(model or os.environ.get("IASSIST_OLLAMA_MODEL", "llama3.2:3b"), timeout)
+        self.host = (host or os.environ.get("OLLAMA_HOST", "http://localhost:11434")).rstrip("/")
+        if "://" not in self.host:
+            self.host = f"http://{self.host}"  # OLLAMA_HOST is often given as host:port
+        self.keep_alive = keep_alive
+        self.max_tokens = max_tokens  # Summaries are ten words, don't let the model ramble
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrent)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.warm_time = None
+        self.warmed = threading.Event()
+        self.warmed.set()  # Only cleared while warm() is loading the model
+
+    def _acquire(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        if not self.warmed.wait(timeout):
+            raise TimeoutError(f"{self.model} still loading after {timeout:.1f}s")
+        if not self.slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise TimeoutError(f"No free {self.name} slot within {timeout:.1f}s")
+
+    def _post(self, path: str, payload: Dict, timeout: float) -> Dict:
+        self._acquire(timeout)
+        try:
+            response = self.session.post(f"{self.host}{path}", json=payload, timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+        finally:
+            self.slots.release()
+
+    def _complete(self, prompt: str, timeout: float) -> str:
+        result = self._post("/api/chat", {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": {"num_predict": self.max_tokens}
+        }, timeout)
+        return result["message"]["content"]
+
+    def _stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        self._acquire(timeout)
+        try:
+            # Closing the response early drops the connection, which is how Ollama is told to stop generating
+            with self.session.post(f"{self.host}/api/chat", json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "stream": True,
+                "keep_alive": self.keep_alive,
+                "options": {"num_predict": self.max_tokens}
+            }, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    part = json.loads(line)
+                    content = part.get("message", {}).get("content")
+                    if content:
+                        yield content
+                    if part.get("done"):
+                        break
+        finally:
+            self.slots.release()
+
+    def warm(self):
+        """Load the model into memory; a generate request with no prompt does nothing else"""
+        start = time.perf_counter()
+        self.warmed.clear()
+        try:
+            response = self.session.post(f"{self.host}/api/generate",
+                                         json={"model": self.model, "keep_alive": self.keep_alive}, timeout=60.0)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"[LLM] Could not warm {self.model} at {self.host}: {e}")
+            return
+        finally:
+            self.warmed.set()
+        self.warm_time = time.perf_counter() - start
+
+    def stats(self) -> Dict[str, object]:
+        stats = super().stats()
+        stats["host"] = self.host
+        if self.warm_time is not None:
+            stats["warm_ms"] = round(self.warm_time * 1000, 1)
+        return stats
+
+BACKENDS = {
+    "groq": GroqBackend,
+    "ollama": OllamaBackend,
+}
+
+def make_backend(name: str = None, **kwargs) -> LLMBackend:
+    """Backend by name, defaulting to IASSIST_LLM (groq if unset)"""
+    name = name or DEFAULT_LLM
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}', expected one of {list(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
@@ -2,11 +2,18 @@ from .imports import *
 from .scene import Scene
 from .priority_list import NavigationQueue
 from .tts import TTSProcessor
+from .pipeline import LatestQueue, Stage
+from .summarizer import SummaryService
+from .models import registry
+from .scheduler import AdaptiveScheduler
+from .metrics import metrics
 
-def main():
+def main(latency_budget: float = float(os.environ.get("IASSIST_LATENCY_BUDGET", 0.2))):
     frame_size = (640, 480)  # Smaller frame size for faster processing
-    fps_target = 30
-    frame_interval = 1.0 / fps_target
+    stats_interval = 10.0  # Print stage queue stats every __ seconds
+
+    # Frame rate, tracking/analysis skips and annotation follow the device's measured latency
+    scheduler = AdaptiveScheduler(latency_budget)
 
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
@@ -15,89 +22,137 @@ def main():
 
     # Fast tracking settings
     tracking_buffer_size = 5  # Keep last 5 frames for movement
-    tracking_frame_skip = 1   # Process every frame for movement
 
     # Slow analysis settings
     analysis_buffer_size = 50  # Larger buffer for scene analysis
-    analysis_frame_skip = 3  # Process every __ th frame for analysis
-    analysis_interval = 2.0    # Summarize scene every __ seconds
 
-    scene = Scene()
-    
     # Separate buffers for tracking and analysis
     tracking_buffer = deque(maxlen=tracking_buffer_size)
     analysis_buffer = deque(maxlen=analysis_buffer_size)
-    
-    frame_count = 0
-    last_analysis = time.time()
 
     scene = Scene()
-    nav_queue = NavigationQueue()
+    nav_queue = NavigationQueue()  # Lives for the whole session so TTL and dedup can work
     tts_processor = TTSProcessor()
-    tts_processor.start_processing_thread()
-
-    try:
-        last_frame_time = time.time()
-        while True:
-            # Frame rate control
-            current_time = time.time()
-            if current_time - last_frame_time < frame_interval:
-                continue
-
-            ret, frame = cap.read()
+    tts_processor.start_processing_thread(nav_queue)
+
+    def speak_summary(response, tag, captured_at):
+        #print("[Scene]", response)
+        priority_queue_item = scene._format_for_priority_queue(response, tag, captured_at) # TURNED TO JSON
+        if nav_queue.add_json_item(priority_queue_item):
+            tts_processor.interrupt(priority_queue_item[1])
+
+    summary_service = SummaryService(scene, speak_summary)
+
+    # Stage queues: capture -> tracking -> presentation, with LLM calls off to the side
+    # Each holds only the newest items so a slow stage drops stale frames
+    frame_queue = LatestQueue(maxsize=2)
+    display_queue = LatestQueue(maxsize=1)
+    stop_event = threading.Event()
+
+    def capture():
+        frame_count = 0
+        next_frame_time = time.monotonic()
+        while not stop_event.is_set():
+            with metrics.timer("capture"):
+                ret, frame = cap.read()
             if not ret:
+                stop_event.set()
                 break
-            
-            # Resize frame for faster processing
-            frame = cv2.resize(frame, frame_size)
 
+            # Resize frame for faster processing
+            with metrics.timer("resize"):
+                frame = cv2.resize(frame, frame_size)
             frame_count += 1
+            frame_queue.put((frame_count, frame, time.time()))
+
+            # Sleep until the next frame is due instead of spinning
+            next_frame_time += 1.0 / scheduler.settings["fps"]
+            delay = next_frame_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_frame_time = time.monotonic()  # Fell behind, don't try to catch up
+
+    last_analysis = [time.time()]
+
+    def track(item):
+        frame_count, frame, current_time = item
+        settings = scheduler.settings
+        start = time.perf_counter()
+
+        # Fast tracking loop
+        if frame_count % settings["tracking_frame_skip"] == 0:
+            tracking_buffer.append((frame, current_time))
+            movement = scene.process_movement(tracking_buffer)
+            if movement:  # Only print if significant movement detected
+                # print("[Movement]", movement)
+                pass
+            # Urgent hazards go straight to speech without waiting for the next analysis
+            for hazard in scene.detect_hazards(frame, current_time):
+                if nav_queue.add_json_item(hazard):
+                    tts_processor.interrupt(hazard[1])
+        elif scene.last_detections is not None:
+            # Untracked frames keep the last known boxes for analysis and display
+            scene.add_detections(current_time, scene.last_detections.carry_forward(current_time))
+
+        # Slower analysis loop
+        if frame_count % settings["analysis_frame_skip"] == 0:
+            analysis_buffer.append((frame, current_time))
+
+        # Periodic scene analysis, handed off so tracking never waits on the LLM
+        if current_time - last_analysis[0] >= settings["analysis_interval"] and analysis_buffer:
+            summary_service.submit(analysis_buffer)
+            last_analysis[0] = current_time
+            analysis_buffer.clear()
+
+        scheduler.observe("tracking", time.perf_counter() - start)
+        display_queue.put((frame, current_time))
+
+    stages = [
+        Stage("tracking", track, frame_queue, stop_event),
+        summary_service.stage
+    ]
+    capture_thread = threading.Thread(target=capture, name="capture", daemon=True)
 
+    try:
+        capture_thread.start()
+        stages[0].start()
+        summary_service.start()
+
+        # Presentation stays on the main thread since cv2.imshow requires it
+        last_stats = time.time()
+        while not stop_event.is_set():
+            item = display_queue.get(timeout=0.1)
+            if item is not None:
+                frame, current_time = item
+                # Display frame with annotations, unless the scheduler has dropped them to save time
+                if scheduler.settings["annotate"]:
+                    start = time.perf_counter()
+                    frame = scene.annotate_frame(frame, current_time)
+                    scheduler.observe("annotation", time.perf_counter() - start)
+                cv2.imshow("Camera", frame)
+                scheduler.observe_latency(time.time() - current_time)
 
-            # Fast tracking loop
-            if frame_count % tracking_frame_skip == 0:
-                tracking_buffer.append((frame, current_time))
-                movement = scene.process_movement(tracking_buffer)
-                if movement:  # Only print if significant movement detected
-                    # print("[Movement]", movement)
-                    pass
-
-
-            # Slower analysis loop
-            if frame_count % analysis_frame_skip == 0:
-                analysis_buffer.append((frame, current_time))
-
-            # Periodic scene analysis
-            if current_time - last_analysis >= analysis_interval:
-                if len(analysis_buffer) > 0:
-                    summary = scene.llm_summarize(analysis_buffer)
-                    #print("[Scene]", summary)
-                    response, tag = summary
-                    priority_queue_item = scene._format_for_priority_queue(response, tag) # TURNED TO JSON
-                    nav_queue = NavigationQueue()
-                    nav_queue.add_json_item(priority_queue_item)
-
-                    if nav_queue.queue:
-                        message, priority = nav_queue.queue[0]
-                        tts_processor.add_message(message, priority)
-                        nav_queue.queue.pop(0)
-                        
-                    last_analysis = current_time
-                    analysis_buffer.clear()
-            
-            if frame_count % analysis_frame_skip == 0:
-                analysis_buffer.append((frame, current_time))
-
-            # Display frame with annotations
-            annotated_frame = scene.annotate_frame(frame)
-
-            cv2.imshow("Camera", annotated_frame)
             if cv2.waitKey(1) & 0xFF == ord("q"):
                 break
 
+            if time.time() - last_stats >= stats_interval:
+                print("[Pipeline]", {stage.name: stage.stats() for stage in stages},
+                      {"display": display_queue.stats()}, {"llm": summary_service.stats()}, {"nav": nav_queue.stats()},
+                      {"hazards": scene.hazards.stats()},
+                      {"tts": tts_processor.stats()}, {"models": registry.stats()},
+                      {"motion": scene.motion_gate.stats()}, {"scheduler": scheduler.stats()})
+                if metrics.enabled:
+                    print("[Metrics]", metrics.log_line())
+                last_stats = time.time()
+
     finally:
+        stop_event.set()
+        summary_service.stop()
+        capture_thread.join(timeout=1.0)
+        stages[0].join(timeout=1.0)
         cap.release()
         cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+# Upper bounds in seconds, from sub-millisecond stages up to LLM calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Fixed-bucket latency histogram; observe() is a bisect and three additions"""
+    __slots__ = ("buckets", "counts", "total", "count", "lock")
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        index = bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.total += seconds
+            self.count += 1
+
+    def percentile(self, q: float) -> float:
+        """Approximate percentile (0-100), interpolated within the bucket it falls in"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """Returned while metrics are disabled so timed blocks cost a method call and nothing else"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Per-stage latency histograms shared by the whole process.
+
+    Wrap a stage with `with metrics.timer("detection"):` or report a duration
+    measured elsewhere with metrics.observe(). Set IASSIST_METRICS=0 to turn
+    every timer into a no-op.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages: Dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+
+    def _histogram(self, stage: str) -> Histogram:
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.stages.setdefault(stage, Histogram())
+        return histogram
+
+    def timer(self, stage: str):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self._histogram(stage))
+
+    def observe(self, stage: str, seconds: float):
+        if self.enabled:
+            self._histogram(stage).observe(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                "count": histogram.count,
+                "mean_ms": round(histogram.total / histogram.count * 1000, 2) if histogram.count else 0.0,
+                "p50_ms": round(histogram.percentile(50) * 1000, 2),
+                "p95_ms": round(histogram.percentile(95) * 1000, 2)
+            }
+            for stage, histogram in sorted(self.stages.items())
+        }
+
+    def log_line(self) -> str:
+        return ", ".join(f"{stage} p50 {s['p50_ms']}ms p95 {s['p95_ms']}ms (n={s['count']})"
+                         for stage, s in self.summary().items())
+
+    def render_prometheus(self, name: str = "iassist_stage_seconds") -> str:
+        """Prometheus text exposition format"""
+        lines = [
+            f"# HELP {name} Time spent in each pipeline stage",
+            f"# TYPE {name} histogram"
+        ]
+        for stage, histogram in sorted(self.stages.items()):
+            with histogram.lock:
+                counts = list(histogram.counts)
+                total, count = histogram.total, histogram.count
+            cumulative = 0
+            for bound, n in zip(list(histogram.buckets) + ["+Inf"], counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+# Process-wide metrics
+metrics = Metrics(enabled=os.environ.get("IASSIST_METRICS", "1") != "0")
@@ -0,0 +1,202 @@
+import importlib.util
+from .imports import *
+from .metrics import metrics
+
+DEFAULT_WEIGHTS = "yolov8n.pt"
+
+# Ways to run a checkpoint on the CPU. Everything but "torch" is exported once by
+# ultralytics and then loaded through the same YOLO API, so tracking works unchanged
+BACKENDS = {
+    "torch": {},
+    "onnx": {"format": "onnx", "simplify": True},
+    "onnx-int8": {"format": "onnx", "simplify": True},  # Weights quantized after export
+    "openvino": {"format": "openvino"},
+    "openvino-int8": {"format": "openvino", "int8": True, "data": "coco8.yaml"},  # Calibrated on coco8
+}
+DEFAULT_BACKEND = os.environ.get("IASSIST_BACKEND", "torch")
+# Optional packages each exported backend needs at run time, beyond requirements.txt
+BACKEND_PACKAGES = {
+    "onnx": ["onnxruntime"],
+    "onnx-int8": ["onnxruntime"],
+    "openvino": ["openvino"],
+    "openvino-int8": ["openvino", "nncf"],
+}
+
+def export_model(weights: str, backend: str, imgsz: Tuple[int, int]) -> str:
+    """Path to weights exported for backend at imgsz (height, width), exporting on first use.
+
+    Exports have a fixed input shape, so the size is part of the file name and
+    each deployment resolution gets its own export.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {list(BACKENDS)}")
+    if backend == "torch":
+        return weights
+
+    stem = f"{os.path.splitext(weights)[0]}_{imgsz[0]}x{imgsz[1]}"
+    path = {
+        "onnx": f"{stem}.onnx",
+        "onnx-int8": f"{stem}-int8.onnx",
+        "openvino": f"{stem}_openvino_model",  # Ultralytics recognizes the format by this suffix
+        "openvino-int8": f"{stem}_int8_openvino_model",
+    }[backend]
+    if os.path.exists(path):
+        return path
+
+    for package in BACKEND_PACKAGES[backend]:
+        if importlib.util.find_spec(package) is None:
+            raise ImportError(f"Backend '{backend}' needs the optional package '{package}': "
+                              f"pip install {' '.join(BACKEND_PACKAGES[backend])}")
+
+    if backend == "onnx-int8":
+        fp32 = export_model(weights, "onnx", imgsz)
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32, path, weight_type=QuantType.QUInt8)
+        return path
+    # Ultralytics always exports next to the weights under the plain name; move it to the sized one
+    exported = YOLO(weights).export(imgsz=list(imgsz), **BACKENDS[backend])
+    os.replace(exported, path)
+    return path
+
+class SharedModel:
+    """One loaded model and the lock that serializes inference on it"""
+
+    def __init__(self, weights: str, model: YOLO, load_time: float, backend: str = "torch",
+                 imgsz: Tuple[int, int] = None):
+        self.weights = weights
+        self.backend = backend
+        self.model = model
+        self.imgsz = imgsz  # Fixed input size of exported models, None for torch
+        self.batched = backend == "torch"  # Exported models take one frame per call
+        self.names = np.array([model.names[i] for i in range(len(model.names))])
+        self.lock = threading.Lock()  # Ultralytics predictors are not thread-safe
+        self.load_time = load_time
+        self.warmup_time = 0.0
+        self.handles = 0
+        self.calls = 0
+
+    def warmup(self, size: Tuple[int, int], runs: int = 2):
+        """Run inference on blank frames so the first real frames don't pay for setup"""
+        frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        start = time.perf_counter()
+        with self.lock:
+            for _ in range(runs):
+                self.model.predict(frame, **self.defaults(verbose=False))
+        self.warmup_time = time.perf_counter() - start
+
+    def defaults(self, **kwargs) -> dict:
+        if self.imgsz is not None:
+            kwargs.setdefault("imgsz", list(self.imgsz))
+        return kwargs
+
+    def run(self, method: Callable, source, kwargs: dict):
+        """Call predict/track, splitting batches for models exported with batch size 1"""
+        if isinstance(source, list) and not self.batched:
+            results = []
+            for frame in source:
+                results.extend(method(frame, **kwargs))
+            return results
+        return method(source, **kwargs)
+
+
+class TrackerHandle:
+    """Per-stream view of a shared model.
+
+    Ultralytics keeps tracker state on the model's predictor, so two streams
+    tracking with one model would mix their track ids. Each handle keeps its
+    own trackers and swaps them onto the predictor around every call.
+    """
+
+    def __init__(self, shared: SharedModel):
+        self.shared = shared
+        self.trackers = None  # Created on this handle's first track() call
+        shared.handles += 1
+
+    @property
+    def model(self) -> YOLO:
+        return self.shared.model
+
+    @property
+    def names(self) -> np.ndarray:
+        return self.shared.names
+
+    def _swap_in(self):
+        predictor = self.shared.model.predictor
+        if predictor is None or not hasattr(predictor, "trackers"):
+            return  # First track() on this model registers and creates trackers itself
+        if self.trackers is not None:
+            predictor.trackers = self.trackers
+        else:
+            # Fresh trackers for a new stream. Re-registering would add duplicate callbacks
+            from ultralytics.trackers.track import on_predict_start
+            on_predict_start(predictor, persist=False)
+
+    def track(self, source, **kwargs):
+        kwargs = self.shared.defaults(persist=True, verbose=False, **kwargs)
+        with self.shared.lock, metrics.timer("detection"):
+            self._swap_in()
+            results = self.shared.run(self.shared.model.track, source, kwargs)
+            self.trackers = self.shared.model.predictor.trackers
+            self.shared.calls += 1
+        return results
+
+    def predict(self, source, **kwargs):
+        kwargs = self.shared.defaults(verbose=False, **kwargs)
+        with self.shared.lock, metrics.timer("detection"):
+            self._swap_in()
+            results = self.shared.run(self.shared.model.predict, source, kwargs)
+            self.shared.calls += 1
+        return results
+
+    def reset(self):
+        """Forget this stream's tracks"""
+        with self.shared.lock:
+            self.trackers = None
+
+
+class ModelRegistry:
+    """Loads each model once per process, warms it up and hands out handles that share it"""
+
+    def __init__(self, warmup_size: Tuple[int, int] = (640, 480), backend: str = DEFAULT_BACKEND):
+        self.warmup_size = warmup_size  # (width, height) frames will arrive at
+        self.backend = backend  # Used when a caller doesn't ask for one
+        self.models: Dict[Tuple[str, str], SharedModel] = {}
+        self.lock = threading.Lock()
+
+    def get(self, weights: str = DEFAULT_WEIGHTS, warmup_size: Tuple[int, int] = None,
+            backend: str = None) -> SharedModel:
+        backend = backend or self.backend
+        warmup_size = warmup_size or self.warmup_size
+        with self.lock:
+            shared = self.models.get((weights, backend))
+            if shared is None:
+                # Exported models have a fixed input size, so export at the deployment resolution
+                imgsz = None if backend == "torch" else (warmup_size[1], warmup_size[0])
+                start = time.perf_counter()
+                path = export_model(weights, backend, imgsz)
+                model = YOLO(path)
+                shared = SharedModel(weights, model, time.perf_counter() - start, backend, imgsz)
+                shared.warmup(warmup_size)
+                self.models[(weights, backend)] = shared
+                print(f"[Models] {weights} ({backend}): loaded in {shared.load_time:.2f}s, "
+                      f"warmed up in {shared.warmup_time:.2f}s")
+            return shared
+
+    def handle(self, weights: str = DEFAULT_WEIGHTS, warmup_size: Tuple[int, int] = None,
+               backend: str = None) -> TrackerHandle:
+        """New per-stream handle onto the shared model"""
+        return TrackerHandle(self.get(weights, warmup_size, backend))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            f"{weights}@{backend}": {
+                "load_time": round(shared.load_time, 3),
+                "warmup_time": round(shared.warmup_time, 3),
+                "handles": shared.handles,
+                "calls": shared.calls
+            }
+            for (weights, backend), shared in self.models.items()
+        }
+
+# Process-wide registry
+registry = ModelRegistry()
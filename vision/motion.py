@@ -0,0 +1,48 @@
+from .imports import *
+
+class MotionGate:
+    """Cheap change detector that decides whether a frame is worth running the detector on.
+
+    Frames are shrunk to a small grayscale thumbnail and compared with the
+    thumbnail of the last frame that was let through. A frame is skipped when
+    fewer than min_changed of its thumbnail pixels differ by more than
+    pixel_threshold (0-255), but never for longer than max_skip seconds in a
+    row, as measured by clock. Counting changed pixels rather than averaging the
+    difference means a small or distant object entering the view, which barely
+    moves the mean, still wakes the detector. clock is read when check() isn't
+    given a time; replays pass one that returns the recording's time.
+    """
+
+    def __init__(self, pixel_threshold: int = 25, min_changed: float = 0.002, max_skip: float = 0.5,
+                 size: Tuple[int, int] = (64, 48), clock: Callable[[], float] = time.monotonic):
+        self.pixel_threshold = pixel_threshold  # Per-pixel difference that counts as a change, above sensor noise
+        self.min_changed = min_changed  # Fraction of changed pixels that makes a frame worth processing
+        self.max_skip = max_skip
+        self.size = size  # (width, height) of the thumbnail
+        self.clock = clock
+        self.reference = None
+        self.reference_time = 0.0
+        self.processed = 0
+        self.skipped = 0
+
+    def check(self, frame: np.ndarray, now: float = None) -> bool:
+        """True if frame should be processed, which also makes it the new reference"""
+        now = self.clock() if now is None else now
+        thumb = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        if (self.reference is not None and now - self.reference_time < self.max_skip
+                and np.count_nonzero(cv2.absdiff(thumb, self.reference) > self.pixel_threshold)
+                < self.min_changed * thumb.size):
+            self.skipped += 1
+            return False
+        self.reference = thumb
+        self.reference_time = now
+        self.processed += 1
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        total = self.processed + self.skipped
+        return {
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "skip_rate": round(self.skipped / total, 3) if total else 0.0
+        }
@@ -0,0 +1,84 @@
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+
+class LatestQueue:
+    """Bounded queue between stages where new items push out stale ones instead of blocking"""
+
+    def __init__(self, maxsize: int = 1):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item: Any):
+        """Add an item, dropping the oldest one if the queue is full"""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Return the oldest item, or None if nothing arrived within timeout"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def depth(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth": len(self._items),
+            "maxsize": self.maxsize,
+            "put": self.put_count,
+            "dropped": self.dropped
+        }
+
+
+class Stage:
+    """Worker thread that applies a handler to every item arriving on its inbox"""
+
+    def __init__(self, name: str, handler: Callable[[Any], None], inbox: LatestQueue,
+                 stop_event: threading.Event):
+        self.name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.stop_event = stop_event
+        self.processed = 0
+        self.busy_time = 0.0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def join(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            item = self.inbox.get(timeout=0.1)
+            if item is None:
+                continue
+            start = time.perf_counter()
+            try:
+                self.handler(item)
+            except Exception as e:
+                print(f"[{self.name}] Error: {e}")
+            self.busy_time += time.perf_counter() - start
+            self.processed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"processed": self.processed, "busy_time": round(self.busy_time, 3)}
+        stats.update(self.inbox.stats())
+        return stats
@@ -28,52 +28,144 @@ priorities = np.random.choice([3, 2, 1], size=len(navigation_data),
 navigation_priorities = dict(zip(navigation_data, priorities))
 
 class NavigationQueue:
-    def __init__(self, initial_size=3):
-        self.queue = []  # Using list instead of deque for more control
-        self.current_index = 0
+    """Long-lived message queue with one deque per priority level.
+
+    Insert and pop are O(1). Messages that wait longer than their priority's TTL
+    are dropped instead of spoken, and a message that is near-identical to one
+    queued or spoken within dedup_window seconds is merged into it.
+
+    Items are (message, priority) or (message, priority, captured_at), where
+    captured_at is the time.time() capture timestamp of the frame the message
+    is about; it is handed back by pop() so the speaker can measure latency.
+    TTLs and the dedup window are measured on clock (time.monotonic unless a
+    replay substitutes recording time).
+    """
+    filler_words = {"a", "an", "the", "is", "are", "to", "your", "you", "of", "there", "there's"}
+    punctuation = str.maketrans({c: " " for c in ".,!?;:-\"()"})
+
+    def __init__(self, initial_size=3, ttl: Dict[int, float] = None, dedup_window: float = 6.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_size = initial_size
+        self.queues = {3: deque(), 2: deque(), 1: deque()}  # Highest to lowest priority
+        self.ttl = ttl or {3: 3.0, 2: 5.0, 1: 8.0}  # Seconds a message stays worth speaking
+        self.dedup_window = dedup_window
+        self.clock = clock
+        self.recent = OrderedDict()  # Dedup key -> (time added, priority), oldest first
+        self.current_item = None  # Item handed out by pop() and not yet done()
         self.interrupted_item = None
         self.interrupted = False
-        self.data = []  # Will store JSON items
-
-    def add_json_item(self, json_item: Tuple[str, int]):
-        """Add a new JSON formatted item to the data list"""
-        message, priority = json_item
+        self.data = deque(maxlen=100)  # Recent items, for display
+        self.lock = threading.Lock()
+        self.available = threading.Condition(self.lock)  # Notified on every insert so a reader can block instead of polling
+        self.size = 0
+        self.merged = 0
+        self.expired = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.size
+
+    def _dedup_key(self, message: str) -> Tuple[str, ...]:
+        words = message.lower().translate(self.punctuation).split()
+        return tuple(word for word in words if word not in self.filler_words)
+
+    def add_json_item(self, json_item: Tuple):
+        """Add a new JSON formatted item to the queue"""
+        message, priority = json_item[0], json_item[1]
         self.data.append((message, priority))
-        
-        # If this is one of the first items, add it to queue immediately
-        if len(self.queue) < 3:
-            self.insert_with_priority((message, priority))
-        # Or if it's high priority, process it
-        elif priority >= 2:
-            self.insert_with_priority((message, priority))
-
-    def sort_queue(self):
-        # Sort by priority (highest first)
-        self.queue.sort(key=lambda x: x[1], reverse=True)
-        # Remove priority 1 items if queue is too long
-        if len(self.queue) > 3:
-            self.queue = [item for item in self.queue if item[1] > 1][:3]
-
-    def insert_with_priority(self, item):
-        message, priority = item
-        if priority == 3:
-            # Interrupt current output and process immediately
-            self.interrupted = True
-            if self.interrupted_item:
-                # Put the previously interrupted item back in queue
-                self.queue.insert(0, self.interrupted_item)
-                self.interrupted_item = None
-            self.queue.insert(0, item)
-        elif priority == 2:
-            # Find position after priority 3s but before priority 1s
-            insert_pos = 0
-            while (insert_pos < len(self.queue) and 
-                   self.queue[insert_pos][1] == 3):
-                insert_pos += 1
-            self.queue.insert(insert_pos, item)
-        else:  # priority 1
-            self.queue.append(item)
-        self.sort_queue()
+        return self.insert_with_priority(json_item)
+
+    def insert_with_priority(self, item) -> bool:
+        """Queue an item, returning False if it was merged into a recent duplicate"""
+        message, priority = item[0], item[1]
+        captured_at = item[2] if len(item) > 2 else None
+        now = self.clock()
+        key = self._dedup_key(message)
+
+        with self.lock:
+            last = self.recent.get(key)
+            if last is not None and now - last[0] < self.dedup_window and last[1] >= priority:
+                self.merged += 1
+                return False
+            self.recent[key] = (now, priority)
+            self.recent.move_to_end(key)
+            while self.recent and (len(self.recent) > 256 or now - next(iter(self.recent.values()))[0] >= self.dedup_window):
+                self.recent.popitem(last=False)
+
+            if priority == 3:
+                # Interrupt current output and resume it after the urgent message
+                self.interrupted = True
+                if self.current_item is not None and self.current_item[1] < 3:
+                    resumed_message, resumed_priority, _, resumed_captured_at = self.current_item
+                    self.interrupted_item = (resumed_message, resumed_priority, now + self.ttl[resumed_priority],
+                                             resumed_captured_at)
+                    self.queues[resumed_priority].appendleft(self.interrupted_item)
+                    self.size += 1
+                    self.current_item = None
+
+            self.queues[priority].append((message, priority, now + self.ttl[priority], captured_at))
+            self.size += 1
+
+            # Over capacity: drop the oldest of the least urgent messages. The message waiting to
+            # resume (always at the front of its queue) is spared at its own level, but is
+            # dropped itself rather than anything more urgent
+            while self.size > self.max_size:
+                for q in (self.queues[1], self.queues[2], self.queues[3]):
+                    if not q:
+                        continue
+                    if q[0] is self.interrupted_item and len(q) > 1:
+                        del q[1]
+                    else:
+                        if q.popleft() is self.interrupted_item:
+                            self.interrupted_item = None
+                    break
+                self.size -= 1
+                self.dropped += 1
+            self.available.notify_all()
+        return True
+
+    def pop(self) -> Optional[Tuple[str, int, Optional[float]]]:
+        """Remove and return the most urgent unexpired (message, priority, captured_at), or None"""
+        now = self.clock()
+        with self.lock:
+            for priority in (3, 2, 1):
+                q = self.queues[priority]
+                while q:
+                    entry = q.popleft()
+                    self.size -= 1
+                    if entry[2] < now:
+                        self.expired += 1
+                        continue
+                    self.current_item = entry
+                    if entry is self.interrupted_item:
+                        self.interrupted_item = None
+                    return entry[0], entry[1], entry[3]
+        return None
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until something is queued or timeout passes; True if the queue is non-empty"""
+        with self.available:
+            return self.available.wait_for(lambda: self.size > 0, timeout)
+
+    def peek_priority(self) -> int:
+        """Priority of the next message, or 0 if the queue is empty"""
+        for priority in (3, 2, 1):
+            if self.queues[priority]:
+                return priority
+        return 0
+
+    def done(self):
+        """Mark the last popped item as fully delivered"""
+        with self.lock:
+            self.current_item = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self),
+            "merged": self.merged,
+            "expired": self.expired,
+            "dropped": self.dropped
+        }
 
     def display_scenario(self, scenario, priority):
         """Display the scenario with proper formatting."""
@@ -104,22 +196,16 @@ class NavigationQueue:
         return True
 
     def process_queue(self):
-        if not self.queue:
-            return False
-
         # Get next item to process
-        current_item = self.queue.pop(0)  # Remove from queue immediately
-
-        # Add next item right away
-        self.add_next_item()
-
-        # Process the removed item
-        if not self.display_scenario(*current_item):
-            # If interrupted, save the current item
-            self.interrupted_item = current_item
-            return True
+        current_item = self.pop()
+        if current_item is None:
+            return False
 
-        return len(self.queue) > 0 or self.current_index < len(self.data)
+        # Process the removed item. If a priority 3 message interrupts it,
+        # insert_with_priority has already queued it again for resuming
+        self.display_scenario(*current_item[:2])
+        self.done()
+        return len(self) > 0
 
 def main():
     nav_queue = NavigationQueue()
@@ -0,0 +1,214 @@
+import sys
+import json
+import tempfile
+from .imports import *
+from .scene import Scene
+from .priority_list import NavigationQueue
+from .summarizer import SummaryCache
+from .tts import TTSProcessor, NullAudioEngine
+from .audio_cache import AudioCache
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def iter_frames(source: str, frame_size: Tuple[int, int] = (640, 480)):
+    """Yield (frame, seconds into the recording) from a video file or a directory of images.
+    Image directories are played back at 30 fps in file name order"""
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if name.lower().endswith(IMAGE_EXTENSIONS))
+        for index, name in enumerate(names):
+            frame = cv2.imread(os.path.join(source, name))
+            if frame is not None:
+                yield cv2.resize(frame, frame_size), index / 30.0
+        return
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Could not open {source}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield cv2.resize(frame, frame_size), index / fps
+            index += 1
+    finally:
+        cap.release()
+
+class ReplayScene(Scene):
+    """Scene whose LLM call is a deterministic stand-in: the local summary, tagged
+    [HIGH] when something is straight ahead"""
+
+    def __init__(self, llm_delay: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.llm_delay = llm_delay  # Simulated network time per call
+
+    def query_llm(self, scene_summary: str, timeout: float = None) -> Tuple[str, str]:
+        if self.llm_delay:
+            time.sleep(self.llm_delay)
+        description = scene_summary.replace("[LOW]", "").strip()
+        tag = "[HIGH]" if "center" in description else "[LOW]"
+        self.memory_buffer.append((time.time(), scene_summary))
+        return f"{tag} {description}.", tag
+
+def silent_pipeline(message: str, voice: str = None, speed: float = 1.0, split_pattern: str = None):
+    """Stand-in for the Kokoro pipeline when it isn't installed: 60 ms of silence per word, per sentence"""
+    for sentence in re.split(split_pattern or r'\n+', message):
+        if sentence.strip():
+            yield sentence, None, np.zeros(int(0.06 * 24000 * len(sentence.split())), dtype=np.float32)
+
+class VideoClock:
+    """Clock that reads recording time, so TTLs, dedup windows and motion skips
+    follow the video instead of how fast this machine replays it"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class StageTimer:
+    """Collects per-stage durations and reports them as percentiles"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def time(self, stage: str, func: Callable, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.samples[stage].append(time.perf_counter() - start)
+        return result
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for stage, samples in self.samples.items():
+            ms = np.array(samples) * 1000
+            report[stage] = {
+                "count": len(ms),
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(np.percentile(ms, 50)), 3),
+                "p95_ms": round(float(np.percentile(ms, 95)), 3),
+                "p99_ms": round(float(np.percentile(ms, 99)), 3)
+            }
+        return report
+
+def replay(source: str, max_frames: int = None, analysis_interval: float = 2.0, analysis_frame_skip: int = 3,
+           tts: bool = True, llm_delay: float = 0.0) -> Dict:
+    """Run a recording through Scene, NavigationQueue and TTSProcessor, one frame at a time.
+
+    Everything runs on this thread in recording time, so the same input makes
+    the same decisions every run: analysis happens every analysis_interval
+    seconds of video, every TTL, dedup window and skip limit is measured on a
+    VideoClock, and each resulting message is synthesized and "played" on a null
+    audio sink before the next frame.
+    """
+    clock = VideoClock()
+    scene = ReplayScene(llm_delay=llm_delay)
+    scene.motion_gate.clock = clock
+    nav_queue = NavigationQueue(clock=clock)
+    tts_processor = None
+    audio_dir = None
+    if tts:
+        audio_dir = tempfile.TemporaryDirectory(prefix="iassist-replay-")  # Removed once the report is built
+        tts_processor = TTSProcessor(audio_cache=AudioCache(audio_dir.name))
+        if tts_processor.pipeline is None:
+            tts_processor.pipeline = silent_pipeline
+        tts_processor.engine = NullAudioEngine(tts_processor.sample_rate)
+
+    summary_cache = SummaryCache(clock=clock)
+    timer = StageTimer()
+    tracking_buffer = deque(maxlen=5)
+    analysis_buffer = deque(maxlen=50)
+    spoken = []
+    read_at = {}  # Frame timestamp -> wall-clock time the frame was read, for glass-to-ear
+    frames = 0
+    last_analysis = 0.0
+    base_time = time.time()  # Scene keys frames by timestamp, so give them distinct wall-clock-like ones
+    start = time.perf_counter()
+
+    for frame_index, (frame, video_time) in enumerate(iter_frames(source)):
+        if max_frames is not None and frame_index >= max_frames:
+            break
+        frame_start = time.perf_counter()
+        timestamp = base_time + video_time
+        clock.now = video_time
+        frames += 1
+        read_at[timestamp] = time.time()
+
+        tracking_buffer.append((frame, timestamp))
+        timer.time("tracking", scene.process_movement, tracking_buffer)
+        hazards = timer.time("hazards", scene.detect_hazards, frame, timestamp, read_at[timestamp])
+        urgent = [hazard for hazard in hazards if nav_queue.add_json_item(hazard)]
+        timer.time("annotation", scene.annotate_frame, frame, timestamp)
+
+        if frame_index % analysis_frame_skip == 0:
+            analysis_buffer.append((frame, timestamp))
+        analyze = video_time - last_analysis >= analysis_interval and analysis_buffer
+        if analyze:
+            signature = timer.time("signature", scene.scene_signature, analysis_buffer)
+            cached = summary_cache.get(signature)
+            if cached is None:
+                summary = timer.time("summary", scene.summarize_scene, analysis_buffer)
+                response, tag = timer.time("llm", scene.query_llm, summary)
+                summary_cache.put(signature, response, tag)
+            else:
+                response, tag = cached
+            captured_at = read_at[analysis_buffer[-1][1]]
+            nav_queue.add_json_item(scene._format_for_priority_queue(response, tag, captured_at))
+            last_analysis = video_time
+            analysis_buffer.clear()
+            read_at.clear()
+
+        if analyze or urgent:
+            while True:
+                item = nav_queue.pop()
+                if item is None:
+                    break
+                spoken.append({"video_time": round(video_time, 3), "message": item[0], "priority": item[1]})
+                if tts_processor is not None:
+                    timer.time("tts", tts_processor.process_message, *item)
+                nav_queue.done()
+
+        timer.samples["frame"].append(time.perf_counter() - frame_start)
+
+    elapsed = time.perf_counter() - start
+    report = {
+        "source": source,
+        "frames": frames,
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+        "stages": timer.report(),
+        "motion": scene.motion_gate.stats(),
+        "nav": nav_queue.stats(),
+        "hazards": scene.hazards.stats(),
+        "summary_cache": summary_cache.stats(),
+        "messages": spoken
+    }
+    if tts_processor is not None:
+        report["tts"] = tts_processor.stats()
+        report["tts"]["audio_seconds"] = round(tts_processor.engine.played_seconds, 3)
+    if audio_dir is not None:
+        audio_dir.cleanup()
+    return report
+
+def main(argv: List[str] = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay a recording through the navigation pipeline")
+    parser.add_argument("source", help="video file or directory of images")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    parser.add_argument("--max-frames", type=int)
+    parser.add_argument("--no-tts", action="store_true", help="skip speech synthesis")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="simulated LLM latency in seconds")
+    args = parser.parse_args(argv)
+
+    report = replay(args.source, max_frames=args.max_frames, tts=not args.no_tts, llm_delay=args.llm_delay)
+    output = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,13 +1,40 @@
 from .imports import *
-from .detected_obj import DetectedObject
+from .detected_obj import DetectionBatch
+from .tracks import TrackHistory
+from .models import registry, TrackerHandle
+from .motion import MotionGate
+from .hazards import HazardEvaluator
+from .metrics import metrics
+from .llm import LLMBackend, GroqBackend, make_backend
     
 class Scene:
-    def __init__(self):
-        self.model = YOLO("yolov8n.pt")
+    def __init__(self, llm_base_url: str = None, llm_timeout: float = 5.0, model: TrackerHandle = None,
+                 llm: LLMBackend = None):
+        self.model = model or registry.handle()  # Pass a handle to share another stream's tracks
+        self.class_names = self.model.names
         self.tracked_objects = {}
+        self.tracks = TrackHistory(history=8)  # Recent positions of every track
+        self.last_tracked_time = None
+        self.movement_threshold = 50  # Pixels between sightings that count as significant movement
+        self.detection_cache = OrderedDict()  # frame timestamp -> detections
+        self.detection_cache_size = 8  # Only the last few frames are ever re-read
+        self.detection_lock = threading.Lock()  # Pipeline stages share the model and cache
+        self.max_batch_size = 8  # Frames sent to the model in one call
+        self.motion_gate = MotionGate()  # Skips the detector while the view isn't changing
+        self.last_detections = None  # Carried forward onto skipped frames
+        self.hazards = HazardEvaluator(self.class_names)  # Urgent warnings straight from the tracks
+        self.llm_max_priority = 1  # The LLM only adds descriptions; urgent messages come from self.hazards
+        self.distance_buckets = (0.25, 0.5)  # Box height as a fraction of the frame: far / mid / near
         self.memory_buffer = deque(maxlen=5)  # Keep last 5 observations
         self.last_seen = time.time()
         load_dotenv()
+        self.llm_timeout = llm_timeout
+        if llm is None:
+            # IASSIST_LLM picks the backend; a base URL means a Groq stand-in server for tests
+            llm = GroqBackend(base_url=llm_base_url, timeout=llm_timeout) if llm_base_url else make_backend(timeout=llm_timeout)
+        self.llm = llm
+        self.llm_stream = os.environ.get("IASSIST_LLM_STREAM", "1") != "0"  # Stop reading after the first sentence
+        self.first_sentence = re.compile(r"\w[^.!?\n]*[.!?\n]")
 
     def _format_memory(self) -> str:
         """Format memory buffer into context string"""
@@ -39,56 +66,77 @@ class Scene:
         else:
             return "down" if dy > 0 else "up"
 
-    def _detect_objects(self, frames: List[np.ndarray], timestamps: List[float]) -> List[DetectedObject]:
-        detections = []
-        for frame, timestamp in zip(frames, timestamps):
-            results = self.model.track(frame, persist=True)[0]
-            
-            if not hasattr(results.boxes, "id") or results.boxes.id is None:
-                continue
-                
-            boxes = results.boxes
-            for box, track_id, conf, cls in zip(
-                boxes.xyxy,
-                boxes.id,
-                boxes.conf,
-                boxes.cls
-            ):
-                x1, y1, x2, y2 = box.tolist()
-                class_name = self.model.names[int(cls)]
-                
-                center_x = (x1 + x2) / 2
-                center_y = (y1 + y2) / 2
-                width = x2 - x1
-                height = y2 - y1
-                
-                curr_obj = DetectedObject(
-                    object_id=int(track_id),
-                    class_name=class_name,
-                    confidence=float(conf),
-                    position=(center_x, center_y),
-                    size=(width, height),
-                    last_seen=timestamp
-                )
-                detections.append(curr_obj)
-        return detections
-
-    def annotate_frame(self, frame: np.ndarray) -> np.ndarray:
+    def _detect_objects(self, frames: List[np.ndarray], timestamps: List[float]) -> DetectionBatch:
+        """Detect objects in each frame, reusing cached results for frames already seen"""
+        with self.detection_lock:
+            found = {}
+            missing = []
+            for frame, timestamp in zip(frames, timestamps):
+                cached = self.detection_cache.get(timestamp)
+                if cached is None:
+                    missing.append((frame, timestamp))
+                else:
+                    found[timestamp] = cached
+
+            # Frames that barely differ from the last detected one reuse its tracks
+            to_track = []
+            for frame, timestamp in missing:
+                if self.last_detections is not None and not self.motion_gate.check(frame):
+                    carried = self.last_detections.carry_forward(timestamp)
+                    self._cache(timestamp, carried)
+                    found[timestamp] = carried
+                else:
+                    to_track.append((frame, timestamp))
+            missing = to_track
+
+            # Frames not seen before go through the tracker once, in capture order
+            for start in range(0, len(missing), self.max_batch_size):
+                batch = missing[start:start + self.max_batch_size]
+                for timestamp, detected in zip([t for _, t in batch], self._track_frames(batch)):
+                    found[timestamp] = detected
+                    self._cache(timestamp, detected)
+                    self.last_detections = detected
+
+        return DetectionBatch.concat([found[timestamp] for timestamp in timestamps], self.class_names)
+
+    def _cache(self, timestamp: float, detections: DetectionBatch):
+        self.detection_cache[timestamp] = detections
+        if len(self.detection_cache) > self.detection_cache_size:
+            self.detection_cache.popitem(last=False)
+
+    def add_detections(self, timestamp: float, detections: DetectionBatch):
+        """Cache detections made elsewhere (e.g. by the server's video loop) so the frame isn't tracked again"""
+        with self.detection_lock:
+            self._cache(timestamp, detections)
+            self.last_detections = detections
+
+    def _track_frames(self, batch: List[Tuple[np.ndarray, float]]) -> List[DetectionBatch]:
+        """Run the tracker over several frames in a single model call"""
+        results = self.model.track([frame for frame, _ in batch])
+        return [self._to_detections(result, timestamp) for result, (_, timestamp) in zip(results, batch)]
+
+    def _to_detections(self, results, timestamp: float) -> DetectionBatch:
+        if not hasattr(results.boxes, "id") or results.boxes.id is None:
+            return DetectionBatch.empty(self.class_names)
+        return DetectionBatch.from_boxes(results.boxes, self.class_names, timestamp)
+
+    def annotate_frame(self, frame: np.ndarray, timestamp: float = None) -> np.ndarray:
         """Draw bounding boxes and labels on frame"""
         annotated = frame.copy()
-        detections = self._detect_objects([frame], [time.time()])
+        if timestamp is None:
+            timestamp = time.time()
+        detections = self._detect_objects([frame], [timestamp])
         
-        for det in detections:
-            x, y = det.position
-            w, h = det.size
-            x1, y1 = int(x - w/2), int(y - h/2)
-            x2, y2 = int(x + w/2), int(y + h/2)
-            
+        for (x1, y1, x2, y2), class_name, confidence in zip(
+            detections.xyxy.astype(int).tolist(),
+            detections.class_names.tolist(),
+            detections.confidences.tolist()
+        ):
             # Draw box
             cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
             
             # Add label
-            label = f"{det.class_name} ({det.confidence:.2f})"
+            label = f"{class_name} ({confidence:.2f})"
             cv2.putText(annotated, label, (x1, y1-10), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
         
@@ -96,45 +144,57 @@ class Scene:
         
     def process_movement(self, tracking_buffer):
         """Process recent frames to detect significant movement"""
-        if len(tracking_buffer) < 2:
+        if not tracking_buffer:
             return None
-            
-        # Compare most recent frames
-        prev_frame, prev_time = tracking_buffer[-2]
+
         curr_frame, curr_time = tracking_buffer[-1]
-        
-        prev_detections = self._detect_objects([prev_frame], [prev_time])
         curr_detections = self._detect_objects([curr_frame], [curr_time])
+
+        # Each frame is added to the track history once, which fills in movement since the last sighting
+        if curr_time != self.last_tracked_time:
+            with metrics.timer("tracking"):
+                self.tracks.update(curr_detections)
+            self.last_tracked_time = curr_time
+
+        if len(tracking_buffer) < 2:
+            return None
         
         # Track significant position changes
+        moved = np.flatnonzero((np.abs(curr_detections.movement) > self.movement_threshold).any(axis=1))
         movements = []
-        for curr in curr_detections:
-            for prev in prev_detections:
-                if curr.object_id == prev.object_id:
-                    dx = curr.position[0] - prev.position[0]
-                    dy = curr.position[1] - prev.position[1]
-                    if abs(dx) > 50 or abs(dy) > 50:  # Significant movement threshold
-                        direction = self._get_movement_direction(dx, dy)
-                        movements.append(f"{curr.class_name} moving {direction}")
+        for index in moved.tolist():
+            dx, dy = curr_detections.movement[index].tolist()
+            direction = self._get_movement_direction(dx, dy)
+            movements.append(f"{curr_detections.class_names[index]} moving {direction}")
         
         return ", ".join(movements) if movements else None
 
+    def detect_hazards(self, frame: np.ndarray, timestamp: float, captured_at: float = None) -> List[Tuple[str, int, Optional[float]]]:
+        """Navigation queue items for anything dangerous in a frame already run through process_movement"""
+        detections = self._detect_objects([frame], [timestamp])
+        with metrics.timer("hazards"):
+            return self.hazards.evaluate(detections, self.tracks, frame.shape[1], frame.shape[0],
+                                         timestamp if captured_at is None else captured_at)
+
     def summarize_scene(self, analysis_buffer) -> str:
         """Generate detailed scene summary from buffer"""
+        with metrics.timer("summary"):
+            return self._summarize_scene(analysis_buffer)
+
+    def _summarize_scene(self, analysis_buffer) -> str:
         if not analysis_buffer:
             return "[LOW] No data available"
             
-        latest_frame, _ = analysis_buffer[-1]
-        detections = self._detect_objects([latest_frame], [time.time()])
+        latest_frame, latest_time = analysis_buffer[-1]
+        detections = self._detect_objects([latest_frame], [latest_time])
         
         # Count objects and track positions
         counts = defaultdict(int)
         positions = defaultdict(list)
         
-        for det in detections:
-            counts[det.class_name] += 1
-            pos = self._get_position(det.position[0], det.position[1])
-            positions[det.class_name].append(pos)
+        for class_name, pos in zip(detections.class_names.tolist(), detections.position_labels().tolist()):
+            counts[class_name] += 1
+            positions[class_name].append(pos)
         
         # Build summary
         summary_parts = []
@@ -146,6 +206,21 @@ class Scene:
                     summary_parts.append(f"{obj_type} on {pos}")
         return "[LOW] " + ", ".join(summary_parts) if summary_parts else "[LOW] Path clear"
     
+    def scene_signature(self, analysis_buffer) -> Tuple:
+        """Canonical key for the scene summarize_scene describes: how many of each
+        (class, position, distance bucket) are in the newest frame, with counts
+        above 3 treated alike. Scenes with the same signature get the same summary."""
+        if not analysis_buffer:
+            return ()
+        latest_frame, latest_time = analysis_buffer[-1]
+        detections = self._detect_objects([latest_frame], [latest_time])
+        distances = np.digitize(detections.sizes[:, 1] / latest_frame.shape[0], self.distance_buckets)
+
+        counts = defaultdict(int)
+        for key in zip(detections.class_ids.tolist(), detections.position_labels().tolist(), distances.tolist()):
+            counts[key] += 1
+        return tuple(sorted((key, min(count, 3)) for key, count in counts.items()))
+
     def find_tag(self, response: str) -> str:
         """Find and return the highest-priority tag in the response."""
         priority = ["[EMERGENCY]", "[HIGH]", "[LOW]"]  # Highest to lowest priority
@@ -156,11 +231,7 @@ class Scene:
 
         return "[LOW]"  # Default to lowest priority
     
-    def llm_summarize(self, analysis_buffer) -> str:
-        if not analysis_buffer:
-            return "[LOW] No data available"
-            
-        scene_summary = self.summarize_scene(analysis_buffer)
+    def _build_prompt(self, scene_summary: str) -> str:
         memory_context = self._format_memory()
 
         context = {
@@ -168,7 +239,7 @@ class Scene:
             "current_scene": scene_summary
         }
 
-        prompt = (
+        return (
             f'''You are iAssist, a virtual assistant helping navigate surroundings.\n'''
             f'''Previous observations:\n{context["previous_observations"]}\n'''
             f'''Current scene: {context["current_scene"]}\n'''
@@ -182,35 +253,64 @@ class Scene:
             f'''[LOW] 2 bookshelves and a chair to your right.'''
             f'''[HIGH] Watch out for the wet floor ahead.'''
         )
-        
-
-        client = Groq(
-            api_key=os.environ.get("GROQ_API_KEY"),
-        )
 
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            model="llama-3.2-3b-preview"
-        )
+    def llm_summarize(self, analysis_buffer) -> Tuple[str, str]:
+        if not analysis_buffer:
+            return "[LOW] No data available", "[LOW]"
+            
+        scene_summary = self.summarize_scene(analysis_buffer)
+        return self.request_summary(scene_summary)
 
+    def request_summary(self, scene_summary: str, timeout: float = None) -> Tuple[str, str]:
+        """Ask the LLM to summarize an already computed scene description"""
         try:
-            response = chat_completion.choices[0].message.content.strip()
-            tag = self.find_tag(response)
-                
-            # Store in memory buffer
-            self.memory_buffer.append((time.time(), scene_summary))
-            
-            return response, tag
+            return self.query_llm(scene_summary, timeout)
         except Exception as e:
             print(f"[LLM] Error: {e}")
-            return "[LOW] Path is clear"
+            return "[LOW] Path is clear", "[LOW]"
+
+    def query_llm(self, scene_summary: str, timeout: float = None) -> Tuple[str, str]:
+        """Same as request_summary but raises on network errors and timeouts"""
+        prompt = self._build_prompt(scene_summary)
+
+        with metrics.timer("llm"):
+            if self.llm_stream:
+                response = self._stream_first_sentence(prompt, timeout or self.llm_timeout).strip()
+            else:
+                response = self.llm.complete(prompt, timeout or self.llm_timeout).strip()
+        tag = self.find_tag(response)
+
+        # Store in memory buffer
+        self.memory_buffer.append((time.time(), scene_summary))
+
+        return response, tag
     
-    def _format_for_priority_queue(self, response: str, tag: str) -> Tuple[str, int]:
+    def _stream_first_sentence(self, prompt: str, timeout: float) -> str:
+        """Read the streamed completion only up to the end of its first sentence.
+
+        The tag comes first and only the first sentence is ever spoken, so the
+        stream is closed there instead of waiting for the rest of the answer.
+        """
+        start = time.perf_counter()
+        text = ""
+        tagged = False
+        chunks = self.llm.stream(prompt, timeout)
+        try:
+            for chunk in chunks:
+                text += chunk
+                if not tagged and ("]" in text or len(text) > 16):
+                    tagged = True
+                    metrics.observe("llm_tag", time.perf_counter() - start)
+                body = text
+                for t in ["[EMERGENCY]", "[HIGH]", "[LOW]"]:
+                    body = body.replace(t, "")
+                if self.first_sentence.search(body):
+                    break
+        finally:
+            chunks.close()  # Cancels whatever the model was still going to say
+        return text
+
+    def _format_for_priority_queue(self, response: str, tag: str, captured_at: float = None) -> Tuple[str, int, Optional[float]]:
         priority_map = {
             "[EMERGENCY]": 3,  # Urgent
             "[HIGH]": 2,      # Important
@@ -225,5 +325,5 @@ class Scene:
         # Extract first sentence for conciseness
         first_sentence = clean_response.split('.')[0].strip()
         
-        # Return format matching NavigationQueue's expected input
-        return (first_sentence, priority_map.get(tag, 1))
\ No newline at end of file
+        # Return format matching NavigationQueue's expected input, with the source frame's capture time
+        return (first_sentence, min(priority_map.get(tag, 1), self.llm_max_priority), captured_at)
\ No newline at end of file
@@ -0,0 +1,94 @@
+from .imports import *
+
+# Rates from full quality to the most degraded. Each step gives up one more thing:
+# analysis frequency first, then tracking rate, then frame rate. Annotation is a
+# separate switch, turned off only when drawing is what costs the most
+DEGRADE_LADDER = [
+    {"analysis_interval": 2.0, "analysis_frame_skip": 3, "tracking_frame_skip": 1, "fps": 30},
+    {"analysis_interval": 4.0, "analysis_frame_skip": 6, "tracking_frame_skip": 1, "fps": 30},
+    {"analysis_interval": 4.0, "analysis_frame_skip": 6, "tracking_frame_skip": 2, "fps": 30},
+    {"analysis_interval": 6.0, "analysis_frame_skip": 6, "tracking_frame_skip": 3, "fps": 15},
+]
+
+class AdaptiveScheduler:
+    """Picks pipeline rates that keep capture-to-display latency within a budget.
+
+    Stages report how long they took and the display reports end-to-end latency,
+    all smoothed with an EWMA. Over budget the scheduler takes one step: it turns
+    annotation off if annotation is the slowest stage, and otherwise moves one
+    rung down the ladder. Well under budget (below recover_ratio * budget) it
+    undoes its most recent step. Steps down wait hold seconds after the previous
+    change and steps up twice that, so it does not flap between two levels.
+    """
+
+    def __init__(self, latency_budget: float = 0.2, ladder: List[Dict] = None, alpha: float = 0.2,
+                 recover_ratio: float = 0.6, hold: float = 2.0):
+        self.latency_budget = latency_budget  # Seconds from capture to display
+        self.ladder = ladder or DEGRADE_LADDER
+        self.alpha = alpha
+        self.recover_ratio = recover_ratio
+        self.hold = hold
+        self.level = 0
+        self.annotate = True
+        self.steps: List[str] = []  # "annotation" or "ladder", most recent last, undone in reverse
+        self.last_change = time.monotonic()
+        self.latency = None  # EWMA of end-to-end latency
+        self.stage_times: Dict[str, float] = {}  # EWMA of each stage's processing time
+        self.changes = 0
+
+    @property
+    def settings(self) -> Dict:
+        return dict(self.ladder[self.level], annotate=self.annotate)
+
+    def _smooth(self, previous: Optional[float], value: float) -> float:
+        return value if previous is None else previous + self.alpha * (value - previous)
+
+    def observe(self, stage: str, seconds: float):
+        self.stage_times[stage] = self._smooth(self.stage_times.get(stage), seconds)
+
+    def observe_latency(self, seconds: float):
+        self.latency = self._smooth(self.latency, seconds)
+        self._update()
+
+    def _slowest_stage(self) -> Optional[str]:
+        if not self.stage_times:
+            return None
+        return max(self.stage_times, key=self.stage_times.get)
+
+    def _update(self):
+        now = time.monotonic()
+        since_change = now - self.last_change
+        if self.latency > self.latency_budget and since_change >= self.hold:
+            at_bottom = self.level == len(self.ladder) - 1
+            if self.annotate and (self._slowest_stage() == "annotation" or at_bottom):
+                self._change("annotation", now)
+            elif not at_bottom:
+                self._change("ladder", now)
+        elif self.latency < self.latency_budget * self.recover_ratio and since_change >= 2 * self.hold:
+            if self.steps:
+                self._change(self.steps[-1], now, undo=True)
+
+    def _change(self, step: str, now: float, undo: bool = False):
+        if step == "annotation":
+            self.annotate = undo
+        else:
+            self.level += -1 if undo else 1
+        if undo:
+            self.steps.pop()
+        else:
+            self.steps.append(step)
+        stages = ", ".join(f"{stage} {t * 1000:.0f}ms" for stage, t in self.stage_times.items())
+        print(f"[Scheduler] latency {self.latency * 1000:.0f}ms vs budget {self.latency_budget * 1000:.0f}ms ({stages}), "
+              f"{'restoring' if undo else 'reducing'} {step}: {self.settings}")
+        self.last_change = now
+        self.changes += 1
+
+    def stats(self) -> Dict:
+        return {
+            "level": self.level,
+            "annotate": self.annotate,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "budget_ms": round(self.latency_budget * 1000, 1),
+            "stages_ms": {stage: round(t * 1000, 1) for stage, t in self.stage_times.items()},
+            "changes": self.changes
+        }
@@ -0,0 +1,147 @@
+from .imports import *
+from .pipeline import LatestQueue, Stage
+
+class SummaryCache:
+    """LLM responses keyed by scene signature, so a scene that hasn't changed
+    reuses its last summary instead of making another network call.
+
+    Entries expire after ttl seconds, so a long static stretch still gets an
+    occasional fresh summary, and the least recently used entry is evicted
+    once maxsize is reached. Ages are read from clock, so a replay can age
+    entries in recording time.
+    """
+
+    def __init__(self, maxsize: int = 64, ttl: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()  # signature -> (stored_at, response, tag)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, signature: Tuple) -> Optional[Tuple[str, str]]:
+        """(response, tag) for the signature, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(signature)
+            if entry is not None and self.clock() - entry[0] > self.ttl:
+                del self.entries[signature]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(signature)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, signature: Tuple, response: str, tag: str):
+        with self.lock:
+            self.entries[signature] = (self.clock(), response, tag)
+            self.entries.move_to_end(signature)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evicted += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "size": len(self.entries),
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
+
+class SummaryService:
+    """Runs LLM scene summaries on a worker thread so the frame loop never waits on the network.
+
+    Only the newest request is kept: a request that is still queued when a newer
+    analysis arrives is dropped, and a response that comes back after its deadline
+    or after a newer analysis was already delivered is discarded instead of spoken.
+    A scene whose signature is in the cache is answered on the caller's thread
+    without queueing anything.
+    """
+
+    def __init__(self, scene, on_summary: Callable[[str, str, float], None], timeout: float = 5.0,
+                 cache: SummaryCache = None):
+        self.scene = scene
+        self.on_summary = on_summary
+        self.timeout = timeout  # Per-request deadline in seconds
+        self.cache = cache or SummaryCache()
+        self.requests = LatestQueue(maxsize=1)
+        self.stop_event = threading.Event()
+        self.stage = Stage("summary", self._run, self.requests, self.stop_event)
+        self.generation = 0
+        self.delivered_generation = 0
+        self.completed = 0
+        self.discarded = 0
+        self.failed = 0
+
+    def start(self):
+        # Load the model in the background so the first summary doesn't pay for it
+        threading.Thread(target=self.scene.llm.warm, name="llm-warm", daemon=True).start()
+        self.stage.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.stage.join(timeout=1.0)
+
+    def submit(self, analysis_buffer):
+        """Summarize the buffer's detections now and queue the LLM call for the worker"""
+        if not analysis_buffer:
+            return
+        # Detection runs on the caller's thread where the frame is still cached
+        signature = self.scene.scene_signature(analysis_buffer)
+        captured_at = analysis_buffer[-1][1]  # The summary describes the newest frame
+        self.generation += 1
+
+        cached = self.cache.get(signature)
+        if cached is not None:
+            # Same scene as a recent summary: repeat it and let in-flight requests for older frames go stale
+            self.delivered_generation = self.generation
+            self.on_summary(cached[0], cached[1], captured_at)
+            return
+
+        scene_summary = self.scene.summarize_scene(analysis_buffer)
+        self.requests.put((self.generation, time.monotonic() + self.timeout, scene_summary, signature, captured_at))
+
+    def _is_stale(self, generation: int, deadline: float) -> bool:
+        return generation <= self.delivered_generation or time.monotonic() > deadline
+
+    def _run(self, request):
+        generation, deadline, scene_summary, signature, captured_at = request
+        if self._is_stale(generation, deadline):
+            self.discarded += 1
+            return
+
+        try:
+            response, tag = self.scene.query_llm(scene_summary, timeout=max(deadline - time.monotonic(), 0.1))
+        except Exception as e:
+            print(f"[LLM] Error: {e}")
+            self.failed += 1
+            return
+
+        self.cache.put(signature, response, tag)  # Still worth keeping even if this one arrived too late
+        if self._is_stale(generation, deadline):
+            self.discarded += 1
+            return
+
+        self.completed += 1
+        self.delivered_generation = generation
+        self.on_summary(response, tag, captured_at)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "submitted": self.generation,
+            "completed": self.completed,
+            "discarded": self.discarded,
+            "failed": self.failed,
+            "queued": self.requests.depth(),
+            "cache": self.cache.stats(),
+            "backend": self.scene.llm.stats()
+        }
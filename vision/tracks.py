@@ -0,0 +1,115 @@
+import numpy as np
+from collections import OrderedDict
+from typing import Dict
+from .detected_obj import DetectionBatch
+
+
+class TrackHistory:
+    """Last few positions and sizes of every track, kept in preallocated ring buffers.
+
+    Each track id is given a slot the first time it is seen, so a frame's
+    detections are joined to their history with one dict lookup per track and
+    array indexing after that. When every slot is taken, the track seen least
+    recently gives up its slot.
+    """
+
+    def __init__(self, history: int = 8, capacity: int = 1024):
+        self.history = history  # Samples kept per track
+        self.capacity = capacity  # Tracks kept at once
+        self.slot_of = OrderedDict()  # Track id -> slot, least recently seen first
+        self.free = list(range(capacity - 1, -1, -1))  # Unused slots
+        self.count = np.zeros(capacity, dtype=np.int64)  # Samples written per slot
+        self.centers = np.zeros((capacity, history, 2), dtype=np.float32)
+        self.sizes = np.zeros((capacity, history, 2), dtype=np.float32)
+        self.times = np.zeros((capacity, history), dtype=np.float64)
+
+    def _assign(self, ids: np.ndarray) -> np.ndarray:
+        """Slots for ids, giving new tracks a free or reclaimed slot with an empty history"""
+        slots = np.empty(len(ids), dtype=np.int64)
+        for i, object_id in enumerate(ids.tolist()):
+            slot = self.slot_of.get(object_id)
+            if slot is None:
+                if self.free:
+                    slot = self.free.pop()
+                else:
+                    _, slot = self.slot_of.popitem(last=False)
+                self.slot_of[object_id] = slot
+                self.count[slot] = 0
+            else:
+                self.slot_of.move_to_end(object_id)
+            slots[i] = slot
+        return slots
+
+    def update(self, detections: DetectionBatch):
+        """Append one frame of detections, filling in their movement and frequency"""
+        tracked = detections.ids >= 0
+        slots = self._assign(detections.ids[tracked])
+
+        centers = detections.centers[tracked]
+        write = self.count[slots] % self.history
+        self.centers[slots, write] = centers
+        self.sizes[slots, write] = detections.sizes[tracked]
+        self.times[slots, write] = detections.timestamps[tracked]
+        self.count[slots] += 1
+
+        # Movement since the previous sighting of the same track
+        counts = self.count[slots]
+        previous = self.centers[slots, (counts - 2) % self.history]
+        detections.movement[tracked] = np.where((counts >= 2)[:, None], centers - previous, 0)
+        detections.frequency[tracked] = counts
+
+    def estimate(self, ids: np.ndarray) -> Dict[str, np.ndarray]:
+        """Velocity, acceleration and time-to-contact for the given track ids, all at once.
+
+        velocity and acceleration are in pixels/s and pixels/s^2, growth is the
+        relative rate of change of box scale (1/s) and time_to_contact is
+        1 / growth for approaching tracks, inf otherwise.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        slots = np.array([self.slot_of.get(object_id, -1) for object_id in ids.tolist()], dtype=np.int64)
+        known = slots >= 0
+        slots = np.where(known, slots, 0)  # Unknown ids read slot 0 but are treated as having no samples
+        counts = np.where(known, self.count[slots], 0)
+        n = len(ids)
+
+        newest = (counts - 1) % self.history
+        previous = (counts - 2) % self.history
+        before = (counts - 3) % self.history
+        # Velocity and growth are measured over the whole retained history to smooth out jitter
+        span = np.clip(np.minimum(counts, self.history) - 1, 0, None)
+        oldest = (counts - 1 - span) % self.history
+
+        t_new = self.times[slots, newest]
+        c_new = self.centers[slots, newest]
+        dt = t_new - self.times[slots, oldest]
+        valid = (span > 0) & (dt > 0)
+        safe_dt = np.where(valid, dt, 1.0)
+
+        velocity = np.where(valid[:, None], (c_new - self.centers[slots, oldest]) / safe_dt[:, None], 0)
+
+        scale_new = np.sqrt(np.prod(self.sizes[slots, newest], axis=1))
+        scale_old = np.sqrt(np.prod(self.sizes[slots, oldest], axis=1))
+        growth = np.where(valid & (scale_old > 0), (scale_new - scale_old) / np.maximum(scale_old, 1e-6) / safe_dt, 0)
+        time_to_contact = np.full(n, np.inf)
+        approaching = growth > 0
+        time_to_contact[approaching] = 1.0 / growth[approaching]
+
+        # Acceleration from the last three samples
+        t_prev = self.times[slots, previous]
+        t_before = self.times[slots, before]
+        dt1 = t_new - t_prev
+        dt2 = t_prev - t_before
+        has_three = (counts >= 3) & (dt1 > 0) & (dt2 > 0)
+        dt1 = np.where(has_three, dt1, 1.0)
+        dt2 = np.where(has_three, dt2, 1.0)
+        v1 = (c_new - self.centers[slots, previous]) / dt1[:, None]
+        v2 = (self.centers[slots, previous] - self.centers[slots, before]) / dt2[:, None]
+        acceleration = np.where(has_three[:, None], (v1 - v2) / ((dt1 + dt2) / 2)[:, None], 0)
+
+        return {
+            "velocity": velocity,
+            "acceleration": acceleration,
+            "growth": growth,
+            "time_to_contact": time_to_contact,
+            "samples": counts
+        }
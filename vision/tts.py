@@ -1,123 +1,231 @@
 import time
-import torch
 import logging
 import numpy as np
-from kokoro import KPipeline
-import soundfile as sf
-import sounddevice as sd
 from concurrent.futures import ThreadPoolExecutor
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
+from collections import deque
 from .priority_list import NavigationQueue
+from .audio_cache import AudioCache
+from .metrics import metrics
 import queue
 import threading
 
+# Speech synthesis and audio output are optional so replays can run on CI boxes
+# without Kokoro or PortAudio; TTSProcessor then needs a pipeline and engine passed in
+try:
+    import torch
+    from kokoro import KPipeline
+except ImportError:
+    KPipeline = None
+try:
+    import sounddevice as sd
+except (ImportError, OSError):  # OSError when the PortAudio library itself is missing
+    sd = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 ##############################################
-# NEW: Continuous Raw Playback using RawOutputStream
+# Persistent output engine fed from a ring buffer
 ##############################################
 
-# A high-resolution clock using time.monotonic_ns()
-class Clock:
-    def __init__(self) -> None:
-        self._t0 = time.monotonic_ns()
+class Utterance:
+    """One message's span of samples in the AudioEngine ring buffer."""
+    __slots__ = ("priority", "start", "end", "closed", "interrupted", "started_at", "done")
 
-    def get_time_ns(self) -> int:
-        return time.monotonic_ns() - self._t0
+    def __init__(self, priority: int, start: int) -> None:
+        self.priority = priority
+        self.start = start  # Absolute sample index of the first sample
+        self.end = start  # Absolute sample index one past the last written sample
+        self.closed = False  # No more audio will be written
+        self.interrupted = False
+        self.started_at = None  # time.monotonic() when the first sample reaches the DAC
+        self.done = threading.Event()  # Set when fully played or interrupted
 
-# A Raw-stream based playback class that uses explicit blocksize and latency.
-# This version uses sd.RawOutputStream so that the callback receives a raw bytes buffer.
-class SoundSD_Raw:
-    def __init__(self, data: np.ndarray, device: int, sample_rate: int,
-                 blocksize: int = 256, latency: float = 0.005) -> None:
-        """
-        Parameters:
-          data: NumPy array containing audio samples (mono or 2D with channels)
-          device: output device index
-          sample_rate: sampling frequency (Hz)
-          blocksize: number of frames per callback (try 128 or 256)
-          latency: desired latency (in seconds), e.g. 0.005 for ~5 ms
-        """
-        # Ensure data is 2D (columns = channels)
-        self._data = data if data.ndim == 2 else data[:, np.newaxis]
-        self._num_frames = self._data.shape[0]
-        self._num_channels = self._data.shape[1]
-        self._clock = Clock()
-        self._current_frame = 0
-        self._target_time = None
-
-        # Open a RawOutputStream. Here we force a blocksize and low latency.
-        self._stream = sd.RawOutputStream(
-            blocksize=blocksize,
-            callback=self._callback,
-            channels=self._num_channels,
-            device=device,
-            dtype='float32',  # we assume our data is float32
-            latency=latency,
+class AudioEngine:
+    """A single long-lived output stream that plays whatever is written to its ring buffer.
+
+    The callback only copies between preallocated arrays, so it does not allocate
+    audio buffers. preempt() discards everything not yet played at the next
+    callback block and audio written afterwards starts right behind it.
+    """
+
+    def __init__(self, sample_rate: int = 24000, blocksize: int = 256,
+                 latency: float = 0.005, capacity_seconds: float = 30.0) -> None:
+        if sd is None:
+            raise RuntimeError("sounddevice/PortAudio is not available; use NullAudioEngine")
+        self.sample_rate = sample_rate
+        self.capacity = int(capacity_seconds * sample_rate)
+        self._ring = np.zeros(self.capacity, dtype=np.float32)
+        self._write_pos = 0  # Absolute samples written
+        self._read_pos = 0  # Absolute samples handed to the device
+        self._flush_to = None  # Set by preempt(), applied by the callback
+        self._utterances = deque()  # Utterances not yet fully played, in write order
+        self._space = threading.Event()  # Set by the callback whenever it frees ring space
+        self._lock = threading.Lock()  # Serializes writers and preempt()
+
+        self._stream = sd.OutputStream(
             samplerate=sample_rate,
+            blocksize=blocksize,   # you can tweak this value
+            latency=latency,       # try latency between 0.003 and 0.010 seconds
+            channels=1,
+            dtype='float32',
+            callback=self._callback,
         )
         self._stream.start()
 
     def _callback(self, outdata, frames, time_info, status) -> None:
-        """Raw stream callback.
-        outdata is a writable bytes-like object.
-        """
         if status:
             print(status)
-        # If no target time is scheduled, fill with silence.
-        if self._target_time is None:
-            outdata[:] = b'\x00' * len(outdata)
-            return
+        out = outdata[:, 0]
 
-        # Calculate how many nanoseconds remain until the scheduled start.
-        # time_info.outputBufferDacTime and time_info.currentTime are in seconds.
-        delta_ns = int((time_info.outputBufferDacTime - time_info.currentTime) * 1e9)
-        if self._clock.get_time_ns() + delta_ns < self._target_time:
-            outdata[:] = b'\x00' * len(outdata)
-            return
+        if self._flush_to is not None:
+            self._read_pos = max(self._read_pos, self._flush_to)
+            self._flush_to = None
 
-        end_frame = self._current_frame + frames
-        if end_frame <= self._num_frames:
-            chunk = self._data[self._current_frame:end_frame, :]
-            self._current_frame += frames
+        n = min(frames, self._write_pos - self._read_pos)
+        if n > 0:
+            start = self._read_pos % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self._ring[start:start + first]
+            if n > first:
+                out[first:n] = self._ring[:n - first]
+            self._read_pos += n
+            self._space.set()
         else:
-            # When we've played all data, pad with zeros and stop scheduling.
-            remaining = self._num_frames - self._current_frame
-            chunk = self._data[self._current_frame:, :]
-            pad = np.zeros((frames - remaining, self._num_channels), dtype=np.float32)
-            chunk = np.vstack((chunk, pad))
-            self._current_frame = 0
-            self._target_time = None
-
-        # Convert the chunk to raw bytes (float32 native order).
-        out_bytes = chunk.astype(np.float32).tobytes()
-        outdata[:] = out_bytes
-
-    def play(self, when: Optional[float] = None) -> None:
-        """Schedule playback.
-        
-        Parameters:
-          when: delay in seconds relative to now (e.g. 0.5 for 500 ms delay).
-                If None, playback starts immediately.
-        """
-        current_ns = self._clock.get_time_ns()
-        self._target_time = current_ns if when is None else current_ns + int(when * 1e9)
+            n = 0
+        if n < frames:
+            out[n:] = 0
+
+        # Update utterance bookkeeping. Writers may append concurrently, so index
+        # instead of iterating; only utterances already reached are looked at
+        dac_delay = time_info.outputBufferDacTime - time_info.currentTime
+        i = 0
+        while i < len(self._utterances):
+            utterance = self._utterances[i]
+            if utterance.start >= self._read_pos:
+                break
+            if utterance.started_at is None and not utterance.interrupted:
+                utterance.started_at = time.monotonic() + max(dac_delay, 0.0)
+            i += 1
+        while self._utterances:
+            utterance = self._utterances[0]
+            if not (utterance.interrupted or (utterance.closed and utterance.end <= self._read_pos)):
+                break
+            self._utterances.popleft()
+            utterance.done.set()
+
+    def begin(self, priority: int) -> Utterance:
+        """Start a new utterance right behind everything already written."""
+        with self._lock:
+            utterance = Utterance(priority, self._write_pos)
+            self._utterances.append(utterance)
+            return utterance
+
+    def write(self, utterance: Utterance, chunk: np.ndarray) -> bool:
+        """Copy audio into the ring, waiting for space if needed. Returns False once interrupted."""
+        chunk = chunk.reshape(-1)
+        offset = 0
+        while offset < chunk.shape[0]:
+            with self._lock:
+                if utterance.interrupted:
+                    return False
+                free = self.capacity - (self._write_pos - self._read_pos)
+                n = min(free, chunk.shape[0] - offset)
+                if n > 0:
+                    start = self._write_pos % self.capacity
+                    first = min(n, self.capacity - start)
+                    self._ring[start:start + first] = chunk[offset:offset + first]
+                    if n > first:
+                        self._ring[:n - first] = chunk[offset + first:offset + n]
+                    self._write_pos += n
+                    utterance.end = self._write_pos
+                    offset += n
+                    continue
+                self._space.clear()
+            self._space.wait(timeout=0.05)
+        return True
+
+    def finish(self, utterance: Utterance) -> None:
+        """Mark the utterance complete; its done event fires after the last sample plays."""
+        utterance.closed = True
+
+    def preempt(self) -> None:
+        """Drop every sample not yet played and interrupt all pending utterances."""
+        with self._lock:
+            for utterance in list(self._utterances):  # Copy: the callback pops concurrently
+                utterance.interrupted = True
+            self._flush_to = self._write_pos
+
+    def close(self) -> None:
+        self.preempt()
+        self._stream.stop()
+        self._stream.close()
+
+class NullAudioEngine:
+    """Drop-in AudioEngine that plays nothing, for replays and machines without audio devices.
+
+    Audio is consumed as soon as it is written: an utterance starts at its first
+    write and is done when finished. played_seconds counts the audio that
+    would have been heard.
+    """
+
+    def __init__(self, sample_rate: int = 24000) -> None:
+        self.sample_rate = sample_rate
+        self.played_seconds = 0.0
+        self._current = None
+
+    def begin(self, priority: int) -> Utterance:
+        self._current = Utterance(priority, 0)
+        return self._current
+
+    def write(self, utterance: Utterance, chunk: np.ndarray) -> bool:
+        if utterance.interrupted:
+            return False
+        if utterance.started_at is None:
+            utterance.started_at = time.monotonic()
+        utterance.end += chunk.size
+        self.played_seconds += chunk.size / self.sample_rate
+        return True
+
+    def finish(self, utterance: Utterance) -> None:
+        utterance.closed = True
+        utterance.done.set()
+
+    def preempt(self) -> None:
+        if self._current is not None and not self._current.done.is_set():
+            self._current.interrupted = True
+            self._current.done.set()
+
+    def close(self) -> None:
+        self.preempt()
 
 ##############################################
-# TTSProcessor using the above Raw Playback backend
+# TTSProcessor using the above output engine
 ##############################################
 
 class TTSProcessor:
-    def __init__(self):
+    def __init__(self, audio_cache: Optional[AudioCache] = None):
         self.pipeline = self._initialize_pipeline()
         self.voice = 'af_sarah'
+        self.speed = 1.0
+        self.sample_rate = 24000
+        self.split_pattern = r'(?<=[.!?])\s+|\n+'  # Sentence-sized segments reach the speaker sooner
+        self.time_to_first_audio = deque(maxlen=200)  # Seconds from dequeue to first sample at the DAC
+        self.glass_to_ear = {3: deque(maxlen=200), 2: deque(maxlen=200), 1: deque(maxlen=200)}  # Seconds from frame capture to first sample at the DAC
+        self.audio_cache = audio_cache if audio_cache is not None else AudioCache()
         self.message_queue = queue.Queue()
         self.is_running = True
         self.current_priority = 0
+        self.current_utterance = None
+        self.engine = None
+        self.nav_queue = None  # Set by start_processing_thread
 
-    def _initialize_pipeline(self) -> Optional[KPipeline]:
+    def _initialize_pipeline(self):
+        if KPipeline is None:
+            logger.error("Kokoro is not installed; TTS pipeline unavailable")
+            return None
         try:
             return KPipeline(
                 lang_code='a',
@@ -128,59 +236,138 @@ class TTSProcessor:
             logger.error(f"Error initializing TTS pipeline: {e}")
             return None
 
-    def _play_audio_continuous(self, full_audio: np.ndarray) -> None:
+    def _get_engine(self) -> AudioEngine:
+        """Open the output stream on first use and keep it for the whole session."""
+        if self.engine is None:
+            self.engine = AudioEngine(sample_rate=self.sample_rate)
+        return self.engine
+
+    def synthesize_stream(self, message: str) -> Iterator[np.ndarray]:
+        """Yield speech for message one segment at a time, as soon as each is generated.
+
+        The whole phrase goes into the audio cache once the last segment is done,
+        and a cached phrase is yielded as a single segment.
         """
-        Play the full_audio continuously using our Raw stream backend.
-        It uses explicit blocksize and latency to minimize gaps.
+        cached = self.audio_cache.get(message, self.voice, self.speed)
+        if cached is not None:
+            yield cached
+            return
+
+        generator = self.pipeline(message, voice=self.voice, speed=self.speed, split_pattern=self.split_pattern)
+        chunks = []
+        segment_start = time.perf_counter()
+        for _, _, audio in generator:
+            metrics.observe("tts_synthesis", time.perf_counter() - segment_start)
+            if not self.is_running:
+                return
+            chunk = np.asarray(audio, dtype=np.float32)
+            chunks.append(chunk)
+            yield chunk
+            segment_start = time.perf_counter()
+        if chunks:
+            self.audio_cache.put(message, self.voice, self.speed, np.concatenate(chunks, axis=0))
+
+    def synthesize(self, message: str) -> Optional[np.ndarray]:
+        """Return the full speech for message, from the audio cache when it has been said before."""
+        chunks = list(self.synthesize_stream(message))
+        if not chunks:
+            return None
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks, axis=0)
+
+    def process_message(self, message: str, priority: int, captured_at: float = None):
+        """Process a single message with priority, playing each segment as soon as it is synthesized.
+
+        captured_at is the time.time() capture timestamp of the frame the message
+        is about; when given, the capture-to-onset latency is recorded per priority.
         """
-        # Query default output device info.
-        device_info = sd.query_devices(sd.default.device["output"])
-        sample_rate = 24000  # using same rate as before
-        # Create our Raw playback object.
-        playback = SoundSD_Raw(
-            full_audio, 
-            device=device_info["index"],
-            sample_rate=sample_rate,
-            blocksize=256,   # you can tweak this value
-            latency=0.005    # try latency between 0.003 and 0.010 seconds
-        )
-        # Schedule playback immediately.
-        playback.play(when=0)
-        # Wait for playback to finish.
-        duration = full_audio.shape[0] / sample_rate
-        time.sleep(duration + 0.1)  # add a small buffer
-
-    def process_message(self, message: str, priority: int):
-        """Process a single message with priority."""
         try:
-            # Interrupt lower priority messages.
-            if priority > self.current_priority:
-                sd.stop()
-
+            engine = self._get_engine()
             self.current_priority = priority
-            generator = self.pipeline(message, voice=self.voice, speed=1.0)
-            chunks = []
-            for _, _, audio in generator:
+            started = time.monotonic()
+            utterance = engine.begin(priority)
+            self.current_utterance = utterance
+            try:
+                for segment in self.synthesize_stream(message):
+                    if not engine.write(utterance, segment):
+                        break  # Preempted by a more urgent message
+            finally:
+                # Always close it, or the callback never gets past it and every later utterance hangs
+                engine.finish(utterance)
+
+            # Wait for playback to finish.
+            while not utterance.done.wait(timeout=0.1):
                 if not self.is_running:
-                    break
-                chunks.append(audio)
-            if chunks:
-                # Concatenate all generated chunks into a single array.
-                full_audio = np.concatenate(chunks, axis=0)
-                # Play the full audio continuously using our Raw stream approach.
-                self._play_audio_continuous(full_audio)
+                    return
+            if utterance.interrupted:
+                logger.info(f"Interrupted: {message}")
+            elif utterance.started_at is not None:
+                metrics.observe("playback", time.monotonic() - utterance.started_at)
+            if utterance.started_at is not None:
+                ttfa = utterance.started_at - started
+                self.time_to_first_audio.append(ttfa)
+                logger.info(f"Time to first audio: {ttfa * 1000:.0f} ms")
+                if captured_at is not None:
+                    # Onset was stamped on the monotonic clock; capture time is wall clock
+                    onset = time.time() - (time.monotonic() - utterance.started_at)
+                    latency = onset - captured_at
+                    self.glass_to_ear.setdefault(priority, deque(maxlen=200)).append(latency)
+                    metrics.observe(f"glass_to_ear_priority{priority}", latency)
         except Exception as e:
             logger.error(f"Error processing message: {e}")
         finally:
+            self.current_utterance = None
             self.current_priority = 0
 
-    def start_processing_thread(self):
-        """Start the message processing thread."""
+    def interrupt(self, priority: int) -> bool:
+        """Cut off the message being spoken if priority is higher than its own."""
+        if self.engine is None or priority <= self.current_priority:
+            return False
+        self.engine.preempt()
+        return True
+
+    def stats(self) -> dict:
+        """Time-to-first-audio and per-priority glass-to-ear percentiles (ms) over recent messages, plus audio cache stats."""
+        stats = {"audio_cache": self.audio_cache.stats()}
+        if self.time_to_first_audio:
+            samples = np.array(self.time_to_first_audio) * 1000
+            stats["ttfa_p50_ms"] = round(float(np.percentile(samples, 50)), 1)
+            stats["ttfa_p95_ms"] = round(float(np.percentile(samples, 95)), 1)
+        glass_to_ear = {}
+        for priority, latencies in sorted(self.glass_to_ear.items(), reverse=True):
+            if latencies:
+                samples = np.array(latencies) * 1000
+                glass_to_ear[priority] = {
+                    "count": len(samples),
+                    "p50_ms": round(float(np.percentile(samples, 50)), 1),
+                    "p95_ms": round(float(np.percentile(samples, 95)), 1),
+                    "p99_ms": round(float(np.percentile(samples, 99)), 1)
+                }
+        if glass_to_ear:
+            stats["glass_to_ear"] = glass_to_ear
+        return stats
+
+    def start_processing_thread(self, nav_queue: Optional[NavigationQueue] = None):
+        """Start the message processing thread.
+
+        If nav_queue is given, messages are pulled from it whenever the speaker
+        is free, so its priorities and TTLs decide what is said next. The thread
+        sleeps on the queue's condition and wakes as soon as anything is inserted.
+        """
+        self.nav_queue = nav_queue
+
         def process_queue():
             while self.is_running:
                 try:
-                    message, priority = self.message_queue.get(timeout=1)
-                    self.process_message(message, priority)
+                    if nav_queue is None:
+                        item = self.message_queue.get(timeout=1)
+                    else:
+                        item = nav_queue.pop()
+                        if item is None:
+                            nav_queue.wait(timeout=1.0)  # The timeout only bounds how long stop() takes to notice
+                            continue
+                    self.process_message(*item)
+                    if nav_queue is not None:
+                        nav_queue.done()
                 except queue.Empty:
                     continue
                 except Exception as e:
@@ -188,14 +375,19 @@ class TTSProcessor:
 
         threading.Thread(target=process_queue, daemon=True).start()
 
-    def add_message(self, message: str, priority: int):
-        """Add a message to the queue."""
-        self.message_queue.put((message, priority))
+    def add_message(self, message: str, priority: int, captured_at: float = None):
+        """Add a message to the queue, interrupting a less urgent message being spoken."""
+        if self.nav_queue is not None:
+            self.nav_queue.add_json_item((message, priority, captured_at))  # Wakes the speaker thread
+        else:
+            self.message_queue.put((message, priority, captured_at))
+        self.interrupt(priority)
 
     def stop(self):
         """Stop the TTS processor."""
         self.is_running = False
-        sd.stop()
+        if self.engine is not None:
+            self.engine.close()
 
 def main():
     tts_processor = TTSProcessor()
@@ -203,15 +395,12 @@ def main():
         return
 
     nav_queue = NavigationQueue()
-    tts_processor.start_processing_thread()
+    # Messages from the navigation queue are spoken by the processing thread.
+    tts_processor.start_processing_thread(nav_queue)
 
     try:
         while True:
-            # Process messages from navigation queue.
-            if nav_queue.queue:
-                message, priority = nav_queue.queue[0]
-                tts_processor.add_message(message, priority)
-                nav_queue.queue.pop(0)
+            time.sleep(1)
     except KeyboardInterrupt:
         logger.info("Stopping TTS processor...")
         tts_processor.stop()